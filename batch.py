@@ -0,0 +1,84 @@
+import multiprocessing as mp
+
+from dataclasses import replace
+
+import typer
+
+from batch_stats import read_config, stats_path, summarize_scan, summarize_stats, write_summary
+from clustering_io import label_matrix
+from edge_scan import scan_clusterings
+from graph_io import load_graph
+from stats import compute_stats, from_existing_clustering
+
+# Set in the parent before forking, so every worker shares the one loaded graph and the clusterings
+_loaded = None
+_clusterings = None
+_scans = None
+
+
+def run_clustering(k, clustering, resolution):
+    ''' Compute and write the stats of the k-th clustering against the shared graph '''
+    return compute_stats(_clusterings[k], _loaded, stats_path(clustering), resolution, scan=_scans[k])
+
+
+def main(
+    network: str = typer.Argument(..., help='The whole network that was clustered'),
+    out_dir: str = typer.Argument(".", help='Where to write summary.csv'),
+    config_file: str = typer.Option("config.tsv", "--config"),
+    workers: int = typer.Option(1, "--workers",
+        help='Number of clusterings to process at the same time'),
+    cache: bool = typer.Option(True, "--cache/--no-cache"),
+    compact_ids: bool = typer.Option(False, "--compact-ids",
+        help='Number nodes densely instead of by ID, for edge lists with sparse or huge node IDs'),
+    edge_only: bool = typer.Option(False, "--edge-only",
+        help='Only summarize the edge-based metrics, without running stats.py on each clustering')
+):
+    global _loaded, _clusterings, _scans
+
+    print("Loading graph...")
+    _loaded = load_graph(network, cache, compact_ids, workers)
+    print("Done")
+
+    config = read_config(config_file)
+    clusterings = list(config['clustering'])
+    resolutions = list(config['resolution'])
+
+    print("Loading clusterings...")
+    _clusterings = [from_existing_clustering(clustering) for clustering in clusterings]
+    if compact_ids:
+        _clusterings = [replace(clustering, nodes=_loaded.compact_ids(clustering.nodes)) for clustering in _clusterings]
+    print("Done")
+
+    print("Scanning edges...")
+    # One pass over the edge list gives the edge-based metrics of every clustering at once
+    n = _loaded.graph.numberOfNodes()
+    labels = label_matrix(_clusterings, n)
+    _scans = scan_clusterings(labels, [len(clustering) for clustering in _clusterings], _loaded.src, _loaded.dst)
+    del labels
+    print("Done")
+
+    if edge_only:
+        summaries = [
+            summarize_scan(scan, clustering, resolution, network, n)
+            for scan, clustering, resolution in zip(_scans, _clusterings, resolutions)
+        ]
+    else:
+        # Forked workers see the graph through copy-on-write pages instead of each loading their own
+        with mp.get_context('fork').Pool(workers) as pool:
+            results = pool.starmap(run_clustering, zip(range(len(clusterings)), clusterings, resolutions), chunksize=1)
+
+        print("Summarizing...")
+        summaries = [summarize_stats(df, network) for df in results]
+        for summary, scan, clustering in zip(summaries, _scans, _clusterings):
+            summary['edge_coverage'] = scan.coverage()
+            summary['node_coverage'] = clustering.sizes().sum() / n
+
+    write_summary(summaries, clusterings, out_dir)
+    print("Done")
+
+
+def entry_point():
+    typer.run(main)
+
+if __name__ == "__main__":
+    entry_point()
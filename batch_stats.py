@@ -2,14 +2,14 @@ import os
 import re
 
 import pandas as pd
-import numpy as np
 
 from sys import argv
 from io import StringIO
 
-def summarize_stats(filename):
-    stats = pd.read_csv(filename)
-    base, ext = os.path.splitext(filename)
+def summarize_stats(stats, network):
+    ''' Summarize a stats.py output table (a DataFrame or a path to its CSV) '''
+    if isinstance(stats, str):
+        stats = pd.read_csv(stats)
 
     overall = stats.iloc[-1]
 
@@ -57,7 +57,7 @@ def summarize_stats(filename):
     conductance_max = conductances.max()
 
     mincuts = stats.iloc[:-1]['connectivity']
-    mincuts_normalized = stats.iloc[:-1]['connectivity_normalized']
+    mincuts_normalized = stats.iloc[:-1]['connectivity_normalized_log10(n)']
 
     mincuts_min = mincuts.min()
     mincuts_max = mincuts.max()
@@ -73,7 +73,7 @@ def summarize_stats(filename):
     mincuts_normalized_mean = mincuts_normalized.mean()
 
     summary_stats = pd.Series({
-        'network': argv[2],
+        'network': network,
         'num_clusters': stats.shape[0] - 1,
         'network_n': n,
         'network_m': m,
@@ -95,27 +95,114 @@ def summarize_stats(filename):
         'mincuts_mean_normalized': mincuts_normalized_mean,
     })
 
-    return summary_stats
+    return pd.concat([summary_stats, connectivity_bounds(stats)])
 
-# Read the file line by line and store in an array
-lines_array = []
-with open('config.tsv', 'r') as file:
-    for line in file:
-        lines_array.append(line.strip())
+def connectivity_bounds(stats):
+    ''' Summary fields for the connectivity bounds of a stats table computed with --mincut-timeout
 
-names = ['clustering,resolution,clusterer']
-config_csv = '\n'.join(names + [re.sub(r'\s+', ',', line) for line in lines_array])
+    mincuts_dist and mincuts_mean only cover the clusters whose mincut is
+    exact. The bounds cover every cluster: each quantile of the lower
+    bounds is at most that quantile of the true mincuts, and each quantile
+    of the upper bounds is at least it. Empty for tables without bounds.
+    '''
+    if 'connectivity_exact' not in stats.columns:
+        return pd.Series(dtype=object)
 
-config = pd.read_csv(StringIO(config_csv))
+    clusters = stats.iloc[:-1]
+    lower = clusters['connectivity_lb']
+    upper = clusters['connectivity_ub']
 
-clusterings = list(config['clustering'])
-clustering_stats = [os.path.splitext(filename)[0] + '_stats.csv' for filename in clusterings]
-summaries = [summarize_stats(clustering_stat) for clustering_stat in clustering_stats]
+    def dist(values):
+        return [values.min(), values.quantile(0.25), values.median(), values.quantile(0.75), values.max()]
 
-summary_df = pd.concat(summaries, axis=1)
-summary_df.columns = clusterings
-summary_df = summary_df.T
+    return pd.Series({
+        'mincuts_inexact': int((~clusters['connectivity_exact'].astype(bool)).sum()),
+        'mincuts_lb_dist': dist(lower),
+        'mincuts_lb_mean': lower.mean(),
+        'mincuts_ub_dist': dist(upper),
+        'mincuts_ub_mean': upper.mean(),
+    })
+
+def summarize_scan(scan, clustering, resolution, network, n):
+    ''' Summarize the edge-based metrics of a clustering without a stats.py table
+
+    parameters
+    ----------
+    scan: EdgeScan of the clustering (see edge_scan.scan_clusterings)
+    clustering: the Clustering the scan was computed for
+    resolution: CPM resolution, -1 to leave out the CPM fields
+    network: name of the network, for the network column
+    n: number of nodes in the network
+
+    The fields match those of summarize_stats, so both kinds of rows fit the
+    same summary table; connectivity is left out.
+    '''
+    node_dist = pd.Series(clustering.sizes())
+    modularities = pd.Series(scan.modularity())
+    conductances = pd.Series(scan.conductance())
+
+    def dist(values):
+        return [values.min(), values.quantile(0.25), values.median(), values.quantile(0.75), values.max()]
+
+    summary = {
+        'network': network,
+        'num_clusters': len(clustering),
+        'network_n': n,
+        'network_m': scan.m,
+        'total_n': node_dist.sum(),
+        'total_m': scan.intra.sum(),
+        'cluster_size_dist': dist(node_dist),
+        'mean_cluster_size': node_dist.mean(),
+        # Summed in cluster order like the "Overall" row of stats.py, so both agree to the last digit
+        'total_modularity': sum(modularities.tolist()),
+        'modularity_dist': dist(modularities),
+        'modularity_mean': modularities.mean(),
+    }
+    if resolution != -1:
+        cpm_scores = pd.Series(scan.cpm(clustering.sizes(), resolution))
+        summary.update({
+            'total_cpm_score': sum(cpm_scores.tolist()),
+            'cpm_dist': dist(cpm_scores),
+            'cpm_mean': cpm_scores.mean(),
+        })
+    summary.update({
+        'conductance_dist': dist(conductances),
+        'conductance_mean': conductances.mean(),
+        'edge_coverage': scan.coverage(),
+        'node_coverage': node_dist.sum() / n,
+    })
+    return pd.Series(summary)
+
+def read_config(filepath='config.tsv'):
+    ''' Read the whitespace-separated clustering, resolution, clusterer table '''
+    # Read the file line by line and store in an array
+    lines_array = []
+    with open(filepath, 'r') as file:
+        for line in file:
+            lines_array.append(line.strip())
+
+    names = ['clustering,resolution,clusterer']
+    config_csv = '\n'.join(names + [re.sub(r'\s+', ',', line) for line in lines_array])
+
+    return pd.read_csv(StringIO(config_csv))
+
+def stats_path(clustering):
+    return os.path.splitext(clustering)[0] + '_stats.csv'
+
+def write_summary(summaries, clusterings, out_dir):
+    summary_df = pd.concat(summaries, axis=1)
+    summary_df.columns = clusterings
+    summary_df = summary_df.T
+
+    print()
+
+    summary_df.to_csv(f'{out_dir}/summary.csv')
+
+if __name__ == '__main__':
+    config = read_config()
 
-print()
+    clusterings = list(config['clustering'])
+    clustering_stats = [stats_path(filename) for filename in clusterings]
+    summaries = [summarize_stats(clustering_stat, argv[2]) for clustering_stat in clustering_stats]
 
-summary_df.to_csv(f'{argv[1]}/summary.csv')
+    write_summary(summaries, clusterings, argv[1])
@@ -0,0 +1,158 @@
+import json
+import re
+
+import pandas as pd
+
+from dataclasses import dataclass, field
+from typing import Iterator
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+
+
+@dataclass
+class BeforeCluster:
+    ''' One input cluster of CM2Universal's before.json, without its node list
+
+    attributes
+    ----------
+    label: the input cluster's ID
+    n: number of nodes in the input cluster
+    extant: whether CM left the cluster untouched
+    descendants: IDs of the clusters CM turned it into
+    '''
+    label: object
+    n: int
+    extant: bool
+    descendants: list = field(default_factory=list)
+
+
+class _Scanner:
+    ''' Incremental tokenizer over a JSON file read in fixed-size chunks '''
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+
+    def fill(self):
+        more = self.f.read(self.chunk_size)
+        if not more:
+            return False
+        self.buf = self.buf[self.pos:] + more
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError(f"Unexpected end of JSON in {self.f.name}")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in {self.f.name}, found {self.buf[self.pos]!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+                # A number that ends the buffer may continue in the next chunk
+                if end < len(self.buf) or not self.fill():
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+
+    def count_array(self):
+        ''' Skip over an array, returning its number of elements '''
+        self.expect('[')
+        first = self.peek()
+        if first == ']':
+            self.pos += 1
+            return 0
+
+        if first == '"':
+            # String elements may contain commas, so decode them one by one
+            count = 0
+            while True:
+                self.value()
+                count += 1
+                if self.peek() == ']':
+                    self.pos += 1
+                    return count
+                self.expect(',')
+
+        # Numbers contain neither commas nor brackets, so count separators without decoding
+        count = 1
+        while True:
+            end = self.buf.find(']', self.pos)
+            if end >= 0:
+                count += self.buf.count(',', self.pos, end)
+                self.pos = end + 1
+                return count
+            count += self.buf.count(',', self.pos)
+            self.pos = len(self.buf)
+            if not self.fill():
+                raise ValueError(f"Unexpected end of JSON in {self.f.name}")
+
+    def record(self):
+        self.expect('{')
+        record = {}
+        if self.peek() == '}':
+            self.pos += 1
+            return record
+        while True:
+            key = self.value()
+            self.expect(':')
+            if key == 'nodes':
+                record['n'] = self.count_array()
+            else:
+                record[key] = self.value()
+            if self.peek() == '}':
+                self.pos += 1
+                return record
+            self.expect(',')
+
+
+def iter_before(filepath, chunk_size=1 << 22) -> Iterator[BeforeCluster]:
+    ''' Stream the input clusters of CM2Universal's before.json
+
+    parameters
+    ----------
+    filepath: the before.json file
+    chunk_size: number of characters read at a time
+
+    Node lists are counted as they are skipped over and never decoded, so
+    memory is bounded by the chunk size and the largest descendants list
+    rather than by the number of nodes in the file.
+    '''
+    with open(filepath) as f:
+        scanner = _Scanner(f, chunk_size)
+        scanner.expect('[')
+        if scanner.peek() == ']':
+            return
+        while True:
+            record = scanner.record()
+            yield BeforeCluster(
+                record['label'], record.get('n', 0), record['extant'], record.get('descendants', [])
+            )
+            if scanner.peek() == ']':
+                return
+            scanner.expect(',')
+
+
+def read_before(filepath) -> pd.DataFrame:
+    ''' before.json as a label, n, extant, descendants table (see iter_before) '''
+    clusters = list(iter_before(filepath))
+    return pd.DataFrame({
+        'label': [cluster.label for cluster in clusters],
+        'n': [cluster.n for cluster in clusters],
+        'extant': [cluster.extant for cluster in clusters],
+        'descendants': [cluster.descendants for cluster in clusters],
+    })
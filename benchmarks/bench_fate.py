@@ -0,0 +1,123 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import typer
+
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from fate import fate_table
+
+
+def legacy_fate_table(ub_data, clustering):
+    ''' The row-wise fate.py computation that fate_table replaced, kept as the reference '''
+    def compute_ratio(row):
+        if row['fate'] == 'degraded':
+            return 0
+        if row['extant']:
+            return 1
+        return int(row['descendant_cluster_size'])/int(row['input_cluster_size'])
+
+    def calc_fate(row):
+        if row['extant']:
+            return 'extant'
+        n = row['num_active_descendants']
+        if n == 0:
+            return 'degraded'
+        elif n == 1:
+            return 'reduced'
+        else:
+            return 'split'
+
+    desc_cluster_sizes = clustering.groupby('cluster_id').size().reset_index(name='node_count')
+    if 'descendants' not in ub_data.columns:
+        ub_data['descendants'] = np.empty((len(ub_data), 0)).tolist()
+
+    ub_data['input_cluster_size'] = ub_data['nodes'].apply(lambda x: len(x))
+    desc_cluster_ids = set(desc_cluster_sizes['cluster_id'].tolist())
+    ub_data['active_descendants'] = ub_data['descendants'].apply(lambda x: [elem for elem in x if elem in desc_cluster_ids])
+    ub_data['num_active_descendants'] = ub_data['active_descendants'].apply(lambda x: len(x))
+    ub_data['active_descendants'] = ub_data['active_descendants'].apply(lambda x: [None] if len(x) == 0 else x)
+
+    before_table = ub_data[['label', 'input_cluster_size', 'active_descendants', 'num_active_descendants', 'extant']]
+    before_table = before_table.explode('active_descendants').reset_index(drop=True)
+    before_table['active_descendants'].fillna(np.nan, inplace=True)
+
+    final_table = pd.merge(before_table, desc_cluster_sizes, left_on='active_descendants', right_on='cluster_id', how='outer')
+    final_table.rename(columns={'node_count': 'descendant_cluster_size', 'label': 'input_cluster'}, inplace=True)
+    final_table = final_table.drop('cluster_id', axis=1)
+    final_table = final_table[final_table['extant'].notna()]
+
+    final_table['fate'] = final_table.apply(calc_fate, axis=1)
+    final_table['size_ratio'] = final_table.apply(compute_ratio, axis=1)
+    return final_table
+
+
+def synthetic_cm_output(num_clusters, seed=0):
+    ''' A before.json table and post-CM clustering shaped like CM2Universal's output
+
+    Half the input clusters are extant. The others split into zero to three
+    descendants, some of which were filtered out after CM.
+    '''
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(11, 60, num_clusters)
+    extant = rng.random(num_clusters) < 0.5
+
+    records = []
+    clustering = []
+    next_node = 0
+    next_descendant = num_clusters
+    for label, (size, is_extant) in enumerate(zip(sizes, extant)):
+        nodes = list(range(next_node, next_node + size))
+        next_node += size
+        record = {'label': label, 'nodes': nodes, 'extant': bool(is_extant), 'descendants': []}
+        if is_extant:
+            clustering.extend((node, label) for node in nodes)
+        else:
+            parts = np.array_split(nodes[:size - int(rng.integers(0, 5))], int(rng.integers(1, 4)))
+            for part in parts:
+                record['descendants'].append(next_descendant)
+                # Descendants that post-CM filtration removed do not appear in the clustering
+                if rng.random() < 0.8:
+                    clustering.extend((node, next_descendant) for node in part)
+                next_descendant += 1
+        records.append(record)
+
+    return pd.DataFrame(records), pd.DataFrame(clustering, columns=['node_id', 'cluster_id'])
+
+
+def slim_before(ub_data):
+    ''' The label, n, extant, descendants table that before_json.read_before returns '''
+    slim = ub_data.assign(n=ub_data['nodes'].str.len())
+    return slim[['label', 'n', 'extant', 'descendants']]
+
+
+def main(
+    sizes: str = typer.Option("1000,10000,100000", "--sizes",
+        help='Comma-separated numbers of input clusters to time'),
+    legacy: bool = typer.Option(True, "--legacy/--no-legacy",
+        help='Also time the row-wise implementation and check that both agree')
+):
+    print(f"{'clusters':>10} {'rows':>10} {'vectorized (s)':>15} {'legacy (s)':>12} {'speedup':>8}")
+    for num_clusters in map(int, sizes.split(',')):
+        ub_data, clustering = synthetic_cm_output(num_clusters)
+
+        start = time.perf_counter()
+        table = fate_table(slim_before(ub_data), clustering)
+        vectorized = time.perf_counter() - start
+
+        if legacy:
+            start = time.perf_counter()
+            expected = legacy_fate_table(ub_data.copy(), clustering)
+            row_wise = time.perf_counter() - start
+            assert table.to_csv(index=False) == expected.to_csv(index=False), "fate tables differ"
+            print(f"{num_clusters:>10} {len(table):>10} {vectorized:>15.3f} {row_wise:>12.3f} {row_wise / vectorized:>7.1f}x")
+        else:
+            print(f"{num_clusters:>10} {len(table):>10} {vectorized:>15.3f}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,113 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import networkit as nk
+import numpy as np
+import typer
+
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from graph_io import canonical_edges
+from kcore import iterative_kcore
+
+
+def synthetic_subgraphs(count, min_n, max_n, avg_degree, seed):
+    ''' Small graphs with a few planted clusters each, like the clusters CM hands to IKC '''
+    rng = np.random.default_rng(seed)
+    nk.setSeed(seed, False)
+    graphs = []
+    for _ in range(count):
+        n = int(rng.integers(min_n, max_n + 1))
+        parts = int(rng.integers(1, 4))
+        p_in = min(1.0, avg_degree * parts / n)
+        graph = nk.generators.ClusteredRandomGraphGenerator(n, parts, p_in, p_in / 20).generate()
+        edges = np.array(list(graph.iterEdges()), dtype=np.int64).reshape(-1, 2)
+        graphs.append((n, *canonical_edges(edges[:, 0], edges[:, 1])))
+    return graphs
+
+
+def subprocess_ikc(ikc_path, directory, n, src, dst, k):
+    ''' What IkcClusterer.cluster did for every graph before it ran IKC in process
+
+    Writes the compact edge list, runs ikc.py under /usr/bin/time like the
+    wrapper, rewrites its CSV and parses that again into cluster -> nodes.
+    '''
+    edge_list = path.join(directory, 'graph.tsv')
+    raw = path.join(directory, 'ikc.raw')
+    parsed = path.join(directory, 'ikc')
+    with open(edge_list, 'w') as f:
+        f.writelines(f'{u}\t{v}\n' for u, v in zip(src.tolist(), dst.tolist()))
+
+    command = ['/usr/bin/env', 'python3', ikc_path, '-e', edge_list, '-o', raw, '-k', str(k)]
+    if os.path.exists('/usr/bin/time'):
+        command = ['/usr/bin/time', '-v'] + command
+    subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+    with open(raw) as f_raw, open(parsed, 'w') as f:
+        for line in f_raw:
+            node_id, cluster_number, _, _ = line.strip().split(',')
+            f.write(f'{cluster_number} {node_id}\n')
+    clusters = {}
+    with open(parsed) as f:
+        for line in f:
+            cluster_number, node_id = line.split()
+            clusters.setdefault(int(cluster_number), []).append(int(node_id))
+    return clusters
+
+
+def as_sets(clusters):
+    return sorted(sorted(nodes) for nodes in clusters)
+
+
+def main(
+    graphs: int = typer.Option(200, "--graphs", help='Number of subgraphs to cluster'),
+    min_n: int = typer.Option(20, "--min-n"),
+    max_n: int = typer.Option(500, "--max-n"),
+    avg_degree: float = typer.Option(10, "--avg-degree"),
+    k: int = typer.Option(5, "--k", "-k"),
+    seed: int = typer.Option(0, "--seed"),
+    ikc_path: str = typer.Option("", "--ikc-path",
+        help='ikc.py to time the subprocess path with, which is skipped if not given'),
+    repeat: int = typer.Option(3, "--repeat", help='Runs of each path; the fastest one is reported')
+):
+    inputs = synthetic_subgraphs(graphs, min_n, max_n, avg_degree, seed)
+    print(f"{graphs} graphs, {sum(n for n, _, _ in inputs)} nodes, {sum(len(src) for _, src, _ in inputs)} edges")
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        in_process = [iterative_kcore(n, src, dst, k)[0] for n, src, dst in inputs]
+        times.append(time.perf_counter() - start)
+    elapsed = min(times)
+    print(f"{'path':<12} {'total (s)':>10} {'per graph (ms)':>15} {'speedup':>8}")
+    print(f"{'in-process':<12} {elapsed:>10.3f} {1000 * elapsed / graphs:>15.2f}")
+
+    if not ikc_path:
+        return
+    directory = tempfile.mkdtemp(prefix='bench_ikc_')
+    try:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            shelled = [subprocess_ikc(ikc_path, directory, n, src, dst, k) for n, src, dst in inputs]
+            times.append(time.perf_counter() - start)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    baseline = min(times)
+    print(f"{'subprocess':<12} {baseline:>10.3f} {1000 * baseline / graphs:>15.2f} {baseline / elapsed:>7.1f}x")
+
+    agree = sum(
+        as_sets(clusters.members(i).tolist() for i in range(len(clusters))) == as_sets(shelled_clusters.values())
+        for clusters, shelled_clusters in zip(in_process, shelled)
+    )
+    print(f"Same clusters on {agree} of {graphs} graphs")
+
+
+if __name__ == "__main__":
+    typer.run(main)
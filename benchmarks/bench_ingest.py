@@ -0,0 +1,118 @@
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import networkit as nk
+import numpy as np
+import typer
+
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from graph_io import file_hash, load_graph, read_edge_arrays
+
+COMPRESSORS = {
+    '.gz': lambda filepath: gzip.open(filepath, 'wb', compresslevel=6),
+    '.bz2': lambda filepath: bz2.open(filepath, 'wb'),
+    '.xz': lambda filepath: lzma.open(filepath, 'wb'),
+}
+
+
+def legacy_load(filepath):
+    ''' How load_graph(cache=False) built the graph before it parsed edge lists itself: networkit's reader plus a pandas pass for the edge arrays '''
+    graph = nk.graphio.EdgeListReader("\t", 0).read(filepath)
+    src, dst = read_edge_arrays(filepath)
+    file_hash(filepath)
+    return graph, src, dst
+
+
+def write_inputs(work_dir, nodes, edges, seed, formats):
+    ''' A random edge list written as text, in each requested compressed format, and as binary int64 pairs '''
+    rng = np.random.default_rng(seed)
+    # Heavy-tailed degrees, so adjacency lists vary in length like in real networks
+    weights = rng.pareto(1.5, nodes) + 1
+    weights /= weights.sum()
+    src = rng.choice(nodes, edges, p=weights)
+    dst = rng.integers(0, nodes, edges)
+
+    files = {'.tsv': path.join(work_dir, 'network.tsv')}
+    with open(files['.tsv'], 'w') as f:
+        for start in range(0, edges, 1 << 20):
+            f.write(''.join(f'{u}\t{v}\n' for u, v in zip(src[start:start + (1 << 20)].tolist(), dst[start:start + (1 << 20)].tolist())))
+
+    for ext in formats:
+        if ext == '.bin':
+            files[ext] = path.join(work_dir, 'network.bin')
+            np.column_stack([src, dst]).astype('<i8').tofile(files[ext])
+            continue
+        files[ext] = files['.tsv'] + ext
+        if ext == '.zst':
+            import zstandard
+            with open(files['.tsv'], 'rb') as f, open(files[ext], 'wb') as out:
+                zstandard.ZstdCompressor().copy_stream(f, out)
+            continue
+        with open(files['.tsv'], 'rb') as f, COMPRESSORS[ext](files[ext]) as out:
+            shutil.copyfileobj(f, out)
+    return files
+
+
+def best_of(repeat, load):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = load()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main(
+    nodes: int = typer.Option(1000000, "--nodes"),
+    edges: int = typer.Option(10000000, "--edges"),
+    seed: int = typer.Option(0, "--seed"),
+    formats: str = typer.Option(".gz,.zst,.bin", "--formats",
+        help='Comma-separated input formats to time besides plain text: .gz, .bz2, .xz, .zst, .bin'),
+    workers: str = typer.Option("1,4", "--workers", help='Comma-separated worker counts to time'),
+    repeat: int = typer.Option(3, "--repeat", help='Runs of each load; the fastest one is reported'),
+    work_dir: str = typer.Option("", "--work-dir", help='Where to write the inputs, defaults to a temporary directory')
+):
+    formats = [ext for ext in formats.split(',') if ext]
+    if '.zst' in formats:
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            print("Skipping .zst, the zstandard package is not installed")
+            formats.remove('.zst')
+
+    directory = work_dir or tempfile.mkdtemp(prefix='bench_ingest_')
+    os.makedirs(directory, exist_ok=True)
+    try:
+        print("Writing inputs...")
+        files = write_inputs(directory, nodes, edges, seed, formats)
+        print("Done")
+
+        baseline, (graph, src, dst) = best_of(repeat, lambda: legacy_load(files['.tsv']))
+        degrees = [graph.degree(u) for u in graph.iterNodes()]
+        print(f"Graph: {graph.numberOfNodes()} nodes, {graph.numberOfEdges()} edges")
+
+        print(f"{'input':<10} {'workers':>8} {'size (MB)':>10} {'load (s)':>10} {'speedup':>8}")
+        print(f"{'.tsv':<10} {'legacy':>8} {path.getsize(files['.tsv']) / 2**20:>10.1f} {baseline:>10.3f} {1:>7.1f}x")
+        for ext, filepath in files.items():
+            for count in map(int, workers.split(',')):
+                elapsed, loaded = best_of(repeat, lambda: load_graph(filepath, cache=False, workers=count))
+                assert loaded.graph.numberOfNodes() == graph.numberOfNodes(), f"{ext} has a different node count"
+                assert np.array_equal(loaded.src, src) and np.array_equal(loaded.dst, dst), f"{ext} has different edges"
+                assert degrees == [loaded.graph.degree(u) for u in loaded.graph.iterNodes()], f"{ext} has different degrees"
+                print(f"{ext:<10} {count:>8} {path.getsize(filepath) / 2**20:>10.1f} {elapsed:>10.3f} {baseline / elapsed:>7.1f}x")
+    finally:
+        if not work_dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    typer.run(main)
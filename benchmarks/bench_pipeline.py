@@ -0,0 +1,274 @@
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+import networkit as nk
+import numpy as np
+import pandas as pd
+import typer
+
+from enum import Enum
+from os import path
+
+REPO = path.dirname(path.dirname(path.abspath(__file__)))
+BENCHMARKS = path.join(REPO, 'benchmarks')
+
+
+class Model(str, Enum):
+    """ Container for the graph generators a benchmark can use """
+    planted = "planted"
+    lfr = "lfr"
+
+
+def generate(model, n, clusters, avg_degree, max_degree, mu, min_cluster, max_cluster, cluster_exponent, seed):
+    ''' Generate a graph with a planted clustering
+
+    parameters
+    ----------
+    model: planted (equal-sized clusters, ClusteredRandomGraphGenerator) or lfr (LFRGenerator)
+    n: number of nodes
+    clusters: number of clusters (planted)
+    avg_degree: expected average degree
+    max_degree: maximum degree (lfr)
+    mu: fraction of each node's edges that leave its cluster
+    min_cluster, max_cluster, cluster_exponent: power-law cluster size distribution (lfr)
+    seed: random seed
+
+    returns
+    -------
+    (networkit graph, node -> cluster array)
+    '''
+    nk.setSeed(seed, False)
+    if model == Model.planted:
+        size = n / clusters
+        p_in = min(1.0, avg_degree * (1 - mu) / max(size - 1, 1))
+        p_out = avg_degree * mu / max(n - size, 1)
+        generator = nk.generators.ClusteredRandomGraphGenerator(n, clusters, p_in, p_out)
+        graph = generator.generate()
+        membership = np.asarray(generator.getCommunities().getVector(), dtype=np.int64)
+    else:
+        generator = nk.generators.LFRGenerator(n)
+        generator.generatePowerlawDegreeSequence(avg_degree, max_degree, -2)
+        generator.generatePowerlawCommunitySizeSequence(min_cluster, max_cluster, -cluster_exponent)
+        generator.setMu(mu)
+        generator.run()
+        graph = generator.getGraph()
+        membership = np.asarray(generator.getPartition().getVector(), dtype=np.int64)
+    return graph, membership
+
+
+def simulate_cm(membership, rng, extant_fraction=0.6):
+    ''' A CM2Universal-style before.json and post-CM clustering derived from a clustering
+
+    Clusters are kept as they are with probability extant_fraction. The
+    others lose up to a fifth of their nodes and split into one to three
+    descendants, a fifth of which are dropped as if filtered after CM.
+    '''
+    order = np.argsort(membership, kind='stable')
+    labels, starts = np.unique(membership[order], return_index=True)
+    groups = np.split(order, starts[1:])
+
+    before = []
+    post = []
+    next_descendant = int(labels.max()) + 1 if len(labels) else 0
+    for label, nodes in zip(labels.tolist(), groups):
+        record = {'label': label, 'nodes': nodes.tolist(), 'extant': True, 'descendants': []}
+        if rng.random() < extant_fraction:
+            post.append(pd.DataFrame({'node_id': nodes, 'cluster_id': label}))
+        else:
+            record['extant'] = False
+            kept = rng.permutation(nodes)[:len(nodes) - int(rng.integers(0, len(nodes) // 5 + 1))]
+            for part in np.array_split(kept, int(rng.integers(1, 4))):
+                record['descendants'].append(next_descendant)
+                if len(part) > 1 and rng.random() >= 0.2:
+                    post.append(pd.DataFrame({'node_id': part, 'cluster_id': next_descendant}))
+                next_descendant += 1
+        before.append(record)
+    return before, pd.concat(post, ignore_index=True)
+
+
+def prepare(work_dir, **params):
+    ''' Generate the benchmark inputs into work_dir, reusing them if they were generated with the same parameters '''
+    files = {
+        'network': path.join(work_dir, 'network.tsv'),
+        'clustering': path.join(work_dir, 'clustering.tsv'),
+        'before': path.join(work_dir, 'before.json'),
+        'post_cm': path.join(work_dir, 'post_cm.tsv'),
+    }
+    meta_file = path.join(work_dir, 'params.json')
+    if path.exists(meta_file):
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if meta['params'] == params and all(path.exists(filepath) for filepath in files.values()):
+            return files, meta['graph']
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(work_dir)
+
+    print("Generating graph...")
+    graph, membership = generate(**params)
+    nk.graphio.EdgeListWriter('\t', 0).write(graph, files['network'])
+    pd.DataFrame({'node_id': np.arange(len(membership)), 'cluster_id': membership}).to_csv(
+        files['clustering'], sep='\t', header=False, index=False
+    )
+
+    before, post = simulate_cm(membership, np.random.default_rng(params['seed']))
+    with open(files['before'], 'w') as f:
+        json.dump(before, f)
+    post.to_csv(files['post_cm'], sep='\t', header=False, index=False)
+    print("Done")
+
+    sizes = np.bincount(membership)
+    sizes = sizes[sizes > 0]
+    graph_info = {
+        'n': graph.numberOfNodes(),
+        'm': graph.numberOfEdges(),
+        'clusters': len(sizes),
+        'cluster_size_dist': np.quantile(sizes, [0, 0.25, 0.5, 0.75, 1]).tolist(),
+    }
+    with open(meta_file, 'w') as f:
+        json.dump({'params': params, 'graph': graph_info}, f, indent=4)
+    return files, graph_info
+
+
+def run_stage(script, args, log):
+    ''' Run one of the repo's scripts, returning its wall time, CPU time and peak RSS
+
+    CPU time and peak RSS cover the script and the workers it waited for.
+    '''
+    with open(log, 'a') as out:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, path.join(REPO, script)] + args, cwd=REPO, stdout=out, stderr=out)
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise RuntimeError(f"{script} failed with exit code {process.returncode}, see {log}")
+    return {
+        'wall_s': wall,
+        'cpu_s': usage.ru_utime + usage.ru_stime,
+        'peak_rss_mb': usage.ru_maxrss / 1024,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    ''' Print wall time ratios against a baseline result file and return the stages slower than tolerance allows '''
+    regressions = []
+    print(f"{'stage':<32} {'baseline (s)':>12} {'current (s)':>12} {'ratio':>7}")
+    for stage, timing in results['timings'].items():
+        if stage not in baseline['timings']:
+            continue
+        old = baseline['timings'][stage]['wall_s']
+        new = timing['wall_s']
+        ratio = new / old if old > 0 else float('inf')
+        flag = ''
+        if ratio > tolerance:
+            regressions.append(stage)
+            flag = ' <-- slower'
+        print(f"{stage:<32} {old:>12.3f} {new:>12.3f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def main(
+    model: Model = typer.Option(Model.lfr, "--model", "-m"),
+    n: int = typer.Option(100000, "--n", help='Number of nodes'),
+    clusters: int = typer.Option(1000, "--clusters", help='Number of clusters (planted)'),
+    avg_degree: float = typer.Option(20, "--avg-degree"),
+    max_degree: int = typer.Option(200, "--max-degree", help='Maximum degree (lfr)'),
+    mu: float = typer.Option(0.2, "--mu", help='Fraction of edges leaving their cluster'),
+    min_cluster: int = typer.Option(11, "--min-cluster", help='Smallest cluster size (lfr)'),
+    max_cluster: int = typer.Option(1000, "--max-cluster", help='Largest cluster size (lfr)'),
+    cluster_exponent: float = typer.Option(1.5, "--cluster-exponent", help='Power-law exponent of cluster sizes (lfr)'),
+    seed: int = typer.Option(0, "--seed"),
+    resolution: float = typer.Option(0.01, "--resolution", "-g"),
+    workers: int = typer.Option(1, "--workers"),
+    repeat: int = typer.Option(3, "--repeat", help='Runs of each stage; the fastest one is reported'),
+    work_dir: str = typer.Option("", "--work-dir", help='Where to generate inputs, defaults to benchmarks/data/{name}'),
+    output: str = typer.Option("", "--output", "-o", help='Result file, defaults to benchmarks/results/{name}_{revision}.json'),
+    baseline: str = typer.Option("", "--compare", help='Result file to compare wall times against'),
+    tolerance: float = typer.Option(1.2, "--tolerance", help='Slowdown ratio above which --compare fails')
+):
+    params = {
+        'model': model.value, 'n': n, 'clusters': clusters, 'avg_degree': avg_degree, 'max_degree': max_degree,
+        'mu': mu, 'min_cluster': min_cluster, 'max_cluster': max_cluster, 'cluster_exponent': cluster_exponent,
+        'seed': seed,
+    }
+    name = f'{model.value}_n{n}_s{seed}'
+    work_dir = work_dir or path.join(BENCHMARKS, 'data', name)
+    files, graph_info = prepare(work_dir, **params)
+    print(f"Graph: {graph_info['n']} nodes, {graph_info['m']} edges, {graph_info['clusters']} clusters")
+
+    base, _ = path.splitext(files['clustering'])
+    stats_csv = base + '_stats.csv'
+    log = path.join(work_dir, 'bench.log')
+    common = ['-i', files['network'], '-e', files['clustering'], '-g', str(resolution)]
+    stages = [
+        # The cold run parses the edge list and writes the graph cache that the warm run reads
+        ('stats_cold', 'stats.py', common + ['--workers', str(workers), '--profile'], True),
+        ('stats_warm', 'stats.py', common + ['--workers', str(workers), '--profile'], False),
+        ('ktrusses', 'ktrusses.py', common + ['-c', 'leiden', '--workers', str(workers)], False),
+        ('summarize', 'summarize.py', [stats_csv, name], False),
+        ('fate', 'fate.py', ['-ub', files['before'], '-e', files['post_cm'], '-o', path.join(work_dir, 'fate.csv')], False),
+    ]
+
+    timings = {}
+    for stage, script, args, cold in stages:
+        print(f"Running {stage}...")
+        runs = []
+        for _ in range(repeat):
+            if cold:
+                shutil.rmtree(files['network'] + '.cache', ignore_errors=True)
+            runs.append(run_stage(script, args, log))
+        timings[stage] = {**min(runs, key=lambda run: run['wall_s']), 'runs': [run['wall_s'] for run in runs]}
+
+        if script == 'stats.py':
+            with open(stats_csv + '_profile.json') as f:
+                for phase in json.load(f)['phases']:
+                    timings[f"{stage}.{phase['phase']}"] = {key: phase[key] for key in ('wall_s', 'cpu_s', 'peak_rss_mb')}
+        print(f"Done in {timings[stage]['wall_s']:.3f}s")
+
+    revision = git_revision()
+    results = {
+        'name': name,
+        'revision': revision,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'workers': workers,
+        'resolution': resolution,
+        'params': params,
+        'graph': graph_info,
+        'timings': timings,
+    }
+
+    if output == "":
+        os.makedirs(path.join(BENCHMARKS, 'results'), exist_ok=True)
+        output = path.join(BENCHMARKS, 'results', f'{name}_{revision or "unknown"}.json')
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Wrote results to {output}")
+
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare(results, json.load(f), tolerance)
+        if regressions:
+            print(f"Slower than {tolerance}x the baseline: {', '.join(regressions)}")
+            raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
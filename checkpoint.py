@@ -0,0 +1,101 @@
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class CheckpointedWriter:
+    ''' Stream per-cluster rows to the stats CSV as clusters finish
+
+    Every row appended to outfile is followed by a "position<TAB>cluster_id"
+    line in the outfile + '.checkpoint' sidecar. Rows arrive in completion
+    order; finish() puts them back in cluster order, appends the "Overall"
+    row and removes the sidecar.
+
+    parameters
+    ----------
+    outfile: the stats CSV
+    columns: the CSV header
+    ids: cluster IDs, indexed by position
+    resume: keep the rows of an interrupted run instead of starting over
+    '''
+    def __init__(self, outfile, columns, ids, resume=False):
+        self.outfile = outfile
+        self.checkpoint = outfile + '.checkpoint'
+        self.columns = columns
+        self.positions = []
+
+        rows = []
+        if resume and os.path.exists(self.checkpoint) and os.path.exists(outfile):
+            self.positions = self._read_checkpoint(ids)
+            rows = self._read_rows()
+            # A kill can land between writing a row and its checkpoint line, so keep only the pairs
+            done = min(len(self.positions), len(rows))
+            self.positions = self.positions[:done]
+            rows = rows[:done]
+
+        with open(self.outfile, 'w', newline='') as f:
+            csv.writer(f).writerow(columns)
+            f.writelines(rows)
+        with open(self.checkpoint, 'w') as f:
+            f.writelines(f'{i}\t{ids[i]}\n' for i in self.positions)
+
+        self.done = set(self.positions)
+        self.out = open(self.outfile, 'a', newline='')
+        self.writer = csv.writer(self.out)
+        self.checkpoint_out = open(self.checkpoint, 'a')
+
+    def _read_checkpoint(self, ids):
+        positions = []
+        with open(self.checkpoint) as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break
+                position, cluster_id = line.rstrip('\n').split('\t')
+                position = int(position)
+                if position >= len(ids) or ids[position] != cluster_id:
+                    raise ValueError(f"{self.checkpoint} was written for a different clustering")
+                positions.append(position)
+        return positions
+
+    def _read_rows(self):
+        with open(self.outfile, newline='') as f:
+            header = f.readline()
+            if header.rstrip('\r\n').split(',') != self.columns:
+                raise ValueError(f"{self.outfile} was written with different columns")
+            return [line for line in f if line.endswith('\n')]
+
+    def write(self, position, row):
+        self.writer.writerow(row)
+        self.out.flush()
+        self.checkpoint_out.write(f'{position}\t{row[0]}\n')
+        self.checkpoint_out.flush()
+        self.positions.append(position)
+        self.done.add(position)
+
+    def finish(self, overall) -> pd.DataFrame:
+        ''' Sort the rows back into cluster order, append the "Overall" row and rewrite the CSV '''
+        self.out.close()
+        self.checkpoint_out.close()
+
+        df = read_rows(self.outfile)
+        df.index = self.positions
+        df = with_overall(df.sort_index(), overall)
+
+        df.to_csv(self.outfile, index=False)
+        os.remove(self.checkpoint)
+        return df
+
+
+def read_rows(filepath):
+    ''' Read stats rows back exactly as they were written '''
+    return pd.read_csv(filepath, dtype={'cluster': str}, float_precision='round_trip')
+
+
+def with_overall(df, overall):
+    ''' Append the "Overall" row, None marking the columns it leaves empty '''
+    overall = [np.nan if value is None else value for value in overall]
+    # Flag columns are made nullable so the empty cell does not turn True/False into 1.0/0.0
+    flags = {column: 'boolean' for column in df.columns if pd.api.types.infer_dtype(df[column]) == 'boolean'}
+    return pd.concat([df.astype(flags), pd.DataFrame([overall], columns=df.columns).astype(flags)], ignore_index=True)
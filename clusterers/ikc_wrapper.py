@@ -6,8 +6,12 @@ from collections import defaultdict
 import csv
 
 import networkit as nk
+import numpy as np
 
 from clusterers.abstract_clusterer import AbstractClusterer
+from clustering_io import load_clustering
+from graph_io import canonical_edges
+from kcore import iterative_kcore
 
 from graph import Graph, IntangibleSubgraph, RealizedSubgraph
 from context import context
@@ -16,9 +20,15 @@ from context import context
 @dataclass
 class IkcClusterer(AbstractClusterer):
     k: int
+    # True to run kcore.iterative_kcore in this process instead of ikc.py at context.ikc_path
+    in_process: bool = False
 
     def cluster(self, graph: Union[Graph, RealizedSubgraph]) -> Iterator[IntangibleSubgraph]:
         """Returns a list of (labeled) subgraphs on the graph"""
+        if self.in_process:
+            yield from self.cluster_in_process(graph)
+            return
+
         cluster_id = graph.index  # the cluster id such as 5a6b2
 
         old_to_new_node_id_mapping = graph.continuous_ids
@@ -55,6 +65,21 @@ class IkcClusterer(AbstractClusterer):
             )
         # return retarr
 
+    def cluster_in_process(self, graph: Union[Graph, RealizedSubgraph]) -> Iterator[IntangibleSubgraph]:
+        """Runs IKC on the graph's edges in this process, without edge list files or a subprocess"""
+        old_to_new_node_id_mapping = graph.continuous_ids
+        new_to_old = np.empty(len(old_to_new_node_id_mapping), dtype=np.int64)
+        new_to_old[list(old_to_new_node_id_mapping.values())] = list(old_to_new_node_id_mapping.keys())
+
+        edges = np.array(
+            [(old_to_new_node_id_mapping[u], old_to_new_node_id_mapping[v]) for u, v in graph.data.iterEdges()],
+            dtype=np.int64
+        ).reshape(-1, 2)
+        src, dst = canonical_edges(edges[:, 0], edges[:, 1])
+        clusters, _, _ = iterative_kcore(len(new_to_old), src, dst, self.k)
+        for i in range(len(clusters)):
+            yield graph.intangible_subgraph(new_to_old[clusters.members(i)].tolist(), str(clusters.ids[i]))
+
     def run_ikc(self, edge_list_path, graph: Union[Graph, RealizedSubgraph], output_file):
         """Runs IKC given an edge list and writes a CSV"""
         ikc_path = context.ikc_path
@@ -119,11 +144,4 @@ class IkcClusterer(AbstractClusterer):
     # TODO: Need to factor in if .tsv
     def from_existing_clustering(self, filepath) -> List[IntangibleSubgraph]:
         # node_id cluster_id format
-        clusters: Dict[str, IntangibleSubgraph] = {}
-        with open(filepath) as f:
-            for line in f:
-                node_id, cluster_id = line.split()
-                clusters.setdefault(
-                    cluster_id, IntangibleSubgraph([], cluster_id)
-                ).subset.append(int(node_id))
-        return list(v for v in clusters.values() if v.n() > 1)
\ No newline at end of file
+        return list(load_clustering(filepath, IntangibleSubgraph).without_singletons())
\ No newline at end of file
@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from typing import Dict, Iterator, List, Union
 from graph import Graph, IntangibleSubgraph, RealizedSubgraph
 from clusterers.abstract_clusterer import AbstractClusterer
+from clustering_io import load_clustering
 from enum import Enum
 import leidenalg as la
 
@@ -30,11 +31,4 @@ class LeidenClusterer(AbstractClusterer):
 
     def from_existing_clustering(self, filepath) -> List[IntangibleSubgraph]:
         # node_id cluster_id format
-        clusters: Dict[str, IntangibleSubgraph] = {}
-        with open(filepath) as f:
-            for line in f:
-                node_id, cluster_id = line.split()
-                clusters.setdefault(
-                    cluster_id, IntangibleSubgraph([], cluster_id)
-                ).subset.append(int(node_id))
-        return list(v for v in clusters.values() if v.n() > 1)
+        return list(load_clustering(filepath, IntangibleSubgraph).without_singletons())
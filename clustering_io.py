@@ -0,0 +1,101 @@
+import csv
+
+import numpy as np
+import pandas as pd
+
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Clustering:
+    ''' A clustering stored as one node array grouped by cluster
+
+    attributes
+    ----------
+    ids: cluster IDs, in order of first appearance in the clustering file
+    nodes: node IDs of all clusters, cluster after cluster
+    offsets: cluster i owns nodes[offsets[i]:offsets[i + 1]]
+    subgraph: class of the views, hm01's IntangibleSubgraph if None, or the
+        class of another graph module the caller runs against (see the clusterers)
+
+    Indexing or iterating yields subgraph views that are only built when
+    asked for.
+    '''
+    ids: np.ndarray
+    nodes: np.ndarray
+    offsets: np.ndarray
+    subgraph: type = field(default=None, repr=False, compare=False)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        subgraph = self.subgraph
+        if subgraph is None:
+            # hm01 is only needed once views are built, not to load or count clusters
+            from hm01.graph import IntangibleSubgraph as subgraph
+        return subgraph(self.members(i).tolist(), self.ids[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def members(self, i):
+        return self.nodes[self.offsets[i]:self.offsets[i + 1]]
+
+    def sizes(self):
+        return np.diff(self.offsets)
+
+    def labels(self, n):
+        ''' Node -> cluster position array of length at least n, -1 marking unclustered nodes '''
+        if len(self.nodes) > 0:
+            n = max(n, int(self.nodes.max()) + 1)
+        labels = np.full(n, -1, dtype=np.int64)
+        labels[self.nodes] = np.repeat(np.arange(len(self)), self.sizes())
+        return labels
+
+    def select(self, mask) -> 'Clustering':
+        ''' The clustering restricted to the clusters where mask is True '''
+        sizes = self.sizes()[mask]
+        offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        return Clustering(self.ids[mask], self.nodes[np.repeat(mask, self.sizes())], offsets, self.subgraph)
+
+    def without_singletons(self) -> 'Clustering':
+        return self.select(self.sizes() > 1)
+
+
+def load_clustering(filepath, subgraph=None) -> Clustering:
+    ''' Read a whitespace-separated node_id cluster_id file in bulk
+
+    Cluster IDs are factorized in order of first appearance, and nodes keep
+    their file order within each cluster, so the clusters come out exactly
+    as the line-by-line loaders built them. IDs are kept byte for byte like
+    line.split() kept them: quotes are not stripped and strings such as NA
+    are not turned into missing values. subgraph is the class of the
+    Clustering's views (see Clustering).
+    '''
+    try:
+        df = pd.read_csv(
+            filepath, delim_whitespace=True, header=None, names=['node_id', 'cluster_id'],
+            dtype={'node_id': np.int64, 'cluster_id': str}, quoting=csv.QUOTE_NONE, na_filter=False, engine='c'
+        )
+    except pd.errors.EmptyDataError:
+        return Clustering(np.zeros(0, dtype=object), np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64), subgraph)
+    codes, ids = pd.factorize(df['cluster_id'], sort=False)
+    order = np.argsort(codes, kind='stable')
+
+    offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=len(ids)), out=offsets[1:])
+    return Clustering(np.asarray(ids, dtype=object), df['node_id'].to_numpy()[order], offsets, subgraph)
+
+
+def label_matrix(clusterings, n):
+    ''' Node x clustering matrix of cluster positions, -1 marking nodes a clustering leaves out (see Clustering.labels) '''
+    for clustering in clusterings:
+        if len(clustering.nodes) > 0:
+            n = max(n, int(clustering.nodes.max()) + 1)
+    labels = np.full((n, len(clusterings)), -1, dtype=np.int64)
+    for k, clustering in enumerate(clusterings):
+        labels[clustering.nodes, k] = np.repeat(np.arange(len(clustering)), clustering.sizes())
+    return labels
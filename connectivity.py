@@ -0,0 +1,373 @@
+import cProfile
+import glob
+import multiprocessing as mp
+import os
+import pstats
+import time
+
+import numpy as np
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing.util import Finalize
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components, minimum_spanning_tree
+
+from hm01.mincut import viecut
+
+from graph_io import canonical_edges
+
+# Rough in-memory footprint of a RealizedSubgraph, used to enforce the memory budget
+REALIZED_NODE_BYTES = 256
+REALIZED_EDGE_BYTES = 160
+
+# Tiers of certify_mincuts, cheapest first; VIECUT marks clusters no certificate settles
+TIERS = ['disconnected', 'degree_one', 'clique', 'min_degree', 'viecut']
+VIECUT = TIERS.index('viecut')
+
+# Random contractions tried for an upper bound once viecut has run out of time
+CONTRACTION_TRIALS = 16
+
+# Clusters with fewer nodes plus edges than this run viecut in process even with a timeout,
+# since forking a process that holds the whole graph costs more than viecut does on them
+TIMEOUT_MIN_SIZE = 1 << 16
+
+# Set in the parent right before forking so that workers inherit them instead of unpickling
+_global_graph = None
+_clusters = None
+_profile_path = None
+_timeout = None
+
+# Per-process cProfile of the mincut hot path, only used when _profile_path is set
+_profiler = None
+
+
+def realized_bytes(ns, ms):
+    ''' Estimated memory taken by realized clusters with ns nodes and ms edges '''
+    return REALIZED_NODE_BYTES * np.asarray(ns, dtype=np.int64) + REALIZED_EDGE_BYTES * np.asarray(ms, dtype=np.int64)
+
+
+def certify_mincuts(clusters, labels, src, dst):
+    ''' Settle the mincut of every cluster whose value follows from cheap certificates
+
+    parameters
+    ----------
+    clusters: Clustering (see clustering_io.load_clustering)
+    labels: node -> cluster position array (see Clustering.labels)
+    src, dst: edge endpoint arrays (see graph_io.read_edge_arrays)
+
+    returns
+    -------
+    mincuts: the mincut of each cluster, -1 where no certificate applies
+    tiers: index into TIERS of the certificate that settled each cluster
+
+    The certificates, in order, on each cluster's induced simple graph:
+        - disconnected: the mincut is 0
+        - degree_one: connected with a node of internal degree 1, the mincut is 1
+        - clique: all n(n-1)/2 edges present, the mincut is n-1
+        - min_degree: the minimum internal degree is an upper bound, and it is
+          also the mincut when it is at least floor(n/2) (Chartrand, 1966)
+    '''
+    mincuts = np.full(len(clusters), -1, dtype=np.int64)
+    tiers = np.full(len(clusters), VIECUT, dtype=np.int64)
+    if len(clusters) == 0:
+        return mincuts, tiers
+
+    # Self-loops never cross a cut, so they are left out of degrees and edge counts
+    src_labels = labels[src]
+    intra = (src_labels >= 0) & (src_labels == labels[dst]) & (src != dst)
+    u = src[intra]
+    v = dst[intra]
+    n = len(labels)
+
+    degree = np.bincount(u, minlength=n) + np.bincount(v, minlength=n)
+    _, component = connected_components(
+        coo_matrix((np.ones(len(u), dtype=np.int8), (u, v)), shape=(n, n)), directed=False
+    )
+
+    starts = clusters.offsets[:-1]
+    min_degree = np.minimum.reduceat(degree[clusters.nodes], starts)
+    member_component = component[clusters.nodes]
+    connected = np.minimum.reduceat(member_component, starts) == np.maximum.reduceat(member_component, starts)
+    ns = clusters.sizes()
+    ms = np.bincount(src_labels[intra], minlength=len(clusters))
+
+    certificates = [
+        (~connected, 0),
+        (min_degree == 1, 1),
+        (ms == ns * (ns - 1) // 2, ns - 1),
+        (min_degree >= ns // 2, min_degree),
+    ]
+    for tier, (applies, value) in enumerate(certificates):
+        settle = applies & (tiers == VIECUT)
+        mincuts[settle] = np.broadcast_to(value, len(clusters))[settle]
+        tiers[settle] = tier
+
+    return mincuts, tiers
+
+
+def realize_and_cut(clusters, global_graph, i, timeout=None):
+    ''' Realize cluster i, compute its mincut and drop the realized subgraph
+
+    returns
+    -------
+    (i, mincut, bounds, seconds spent realizing, seconds spent in viecut),
+    where bounds is None unless viecut did not finish within timeout
+    seconds. The cluster then gets (lower, upper) bounds from
+    mincut_bounds, which are computed here, in the worker, within another
+    timeout seconds, and mincut is None unless they meet.
+    '''
+    start = time.perf_counter()
+    cluster = clusters[i].realize(global_graph)
+    realized = time.perf_counter()
+    mincut = timed_viecut(cluster, timeout)
+    cut = time.perf_counter()
+    bounds = None
+    if mincut is None:
+        bounds = mincut_bounds(*realized_edges(cluster, clusters.members(i)), timeout)
+        mincut = bounds[0] if bounds[0] == bounds[1] else None
+    del cluster
+    return i, mincut, bounds, realized - start, cut - realized
+
+
+def _send_viecut(cluster, sender):
+    sender.send(viecut(cluster)[-1])
+    sender.close()
+
+
+def timed_viecut(cluster, timeout=None):
+    ''' The mincut of a realized cluster, or None if viecut takes longer than timeout seconds
+
+    With a timeout, viecut runs in a forked child process that is killed
+    when the time is up, so a giant cluster cannot hold up the run.
+    Clusters smaller than TIMEOUT_MIN_SIZE always run to the end in this
+    process.
+    '''
+    if timeout is None or cluster.n() + cluster.m() < TIMEOUT_MIN_SIZE:
+        return viecut(cluster)[-1]
+
+    context = mp.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    child = context.Process(target=_send_viecut, args=(cluster, sender))
+    child.start()
+    sender.close()
+    try:
+        if not receiver.poll(timeout):
+            return None
+        try:
+            return receiver.recv()
+        except EOFError:
+            child.join()
+            raise RuntimeError(f"viecut exited with code {child.exitcode} on cluster {cluster.index}")
+    finally:
+        if child.is_alive():
+            child.kill()
+        child.join()
+        receiver.close()
+
+
+def realized_edges(cluster, members):
+    ''' The simple graph of a realized cluster, numbered 0..n-1 in the order of its members
+
+    returns
+    -------
+    (n, src, dst) with canonical edge arrays (see graph_io.canonical_edges)
+    and without self-loops
+    '''
+    edges = np.array(list(cluster.data.iterEdges()), dtype=np.int64).reshape(-1, 2)
+    order = np.argsort(members, kind='stable')
+    edges = order[np.searchsorted(members[order], edges)]
+    loops = edges[:, 0] == edges[:, 1]
+    return len(members), *canonical_edges(edges[~loops, 0], edges[~loops, 1])
+
+
+def mincut_bounds(n, src, dst, time_limit=None, rng=None):
+    ''' Proven lower and upper bounds on the mincut of a cluster viecut ran out of time on
+
+    parameters
+    ----------
+    n: number of nodes
+    src, dst: canonical edge arrays of a simple graph on nodes 0..n-1 (see realized_edges)
+    time_limit: seconds after which no more trees or contractions are tried, None for no limit
+    rng: numpy Generator for the random edge weights
+
+    returns
+    -------
+    (lower, upper), equal when the bounds settle the mincut
+
+    The upper bound is the smaller of the minimum degree and the cuts
+    found by random contractions: a minimum spanning tree on random edge
+    weights without its heaviest edge leaves the two sides of a Karger
+    contraction. The lower bound is the larger of min(δ, 2δ + 2 - n),
+    which holds for every connected simple graph, and the number of
+    edge-disjoint spanning trees packed greedily, since every cut crosses
+    each of them.
+    '''
+    start = time.perf_counter()
+    if rng is None:
+        rng = np.random.default_rng(0)
+
+    def expired():
+        return time_limit is not None and time.perf_counter() - start > time_limit
+
+    def spanning_tree(u, v):
+        weights = 1 + rng.random(len(u))
+        return minimum_spanning_tree(coo_matrix((weights, (u, v)), shape=(n, n))).tocoo()
+
+    components, _ = connected_components(
+        coo_matrix((np.ones(len(src), dtype=np.int8), (src, dst)), shape=(n, n)), directed=False
+    )
+    if components > 1:
+        return 0, 0
+
+    degree = np.bincount(src, minlength=n) + np.bincount(dst, minlength=n)
+    min_degree = int(degree.min())
+    upper = min_degree
+    lower = max(1, min(min_degree, 2 * min_degree + 2 - n))
+
+    for _ in range(CONTRACTION_TRIALS):
+        if lower >= upper or expired():
+            break
+        tree = spanning_tree(src, dst)
+        keep = np.arange(tree.nnz) != np.argmax(tree.data)
+        _, side = connected_components(
+            coo_matrix((tree.data[keep], (tree.row[keep], tree.col[keep])), shape=(n, n)), directed=False
+        )
+        upper = min(upper, int((side[src] != side[dst]).sum()))
+
+    keys = src * n + dst
+    remaining = np.ones(len(src), dtype=bool)
+    trees = 0
+    while trees < upper and not expired():
+        tree = spanning_tree(src[remaining], dst[remaining])
+        if tree.nnz < n - 1:
+            break
+        trees += 1
+        low = np.minimum(tree.row, tree.col).astype(np.int64)
+        high = np.maximum(tree.row, tree.col).astype(np.int64)
+        remaining[np.searchsorted(keys, low * n + high)] = False
+    return max(lower, trees), upper
+
+
+def _mincut(i):
+    if _profiler is None:
+        return realize_and_cut(_clusters, _global_graph, i, _timeout)
+
+    _profiler.enable()
+    try:
+        return realize_and_cut(_clusters, _global_graph, i, _timeout)
+    finally:
+        _profiler.disable()
+
+
+def _start_profile():
+    ''' Profile the _mincut calls of this pool worker and dump them once it exits '''
+    global _profiler
+    _profiler = cProfile.Profile()
+    Finalize(None, _dump_profile, exitpriority=0)
+
+
+def _dump_profile():
+    _profiler.dump_stats(f'{_profile_path}.{os.getpid()}')
+
+
+def _profile_parts(profile_path):
+    return glob.glob(glob.escape(profile_path) + '.[0-9]*')
+
+
+def _merge_profiles(profile_path):
+    ''' Combine the per-process dumps of _mincut into a single pstats file '''
+    parts = _profile_parts(profile_path)
+    if parts:
+        pstats.Stats(*parts).dump_stats(profile_path)
+    for part in parts:
+        os.remove(part)
+
+
+def iter_mincuts(clusters, global_graph, positions, workers=1, ms=None, memory_budget=None, profile_path=None, timeout=None):
+    ''' Compute the mincuts of some clusters, yielding them as they finish
+
+    parameters
+    ----------
+    clusters: Clustering (see clustering_io.load_clustering)
+    global_graph: Graph the clusters are realized on
+    positions: positions of the clusters to compute
+    workers: number of worker processes, 1 to compute in this process
+    ms: number of edges in each cluster, needed with memory_budget
+    memory_budget: bytes that realized clusters may take up at the same time
+    profile_path: where to write a cProfile dump of the realizations and viecut calls
+    timeout: seconds viecut may take on one cluster, None for no limit
+
+    yields
+    ------
+    (position, mincut, bounds, realize seconds, viecut seconds) in completion
+    order, with bounds for the clusters that ran out of time (see
+    realize_and_cut)
+
+    Each cluster is realized right before its mincut and dropped right
+    after, so there is at most one realized cluster per worker. With
+    several workers, clusters are submitted largest first so that the
+    giant ones start early instead of becoming stragglers, and a cluster
+    is only started while the estimated footprint of the running ones
+    stays within memory_budget. A cluster that exceeds the budget on its
+    own still runs, but alone.
+    '''
+    global _global_graph, _clusters, _profile_path, _profiler, _timeout
+    _global_graph = global_graph
+    _clusters = clusters
+    _profile_path = profile_path
+    _timeout = timeout
+    if profile_path is not None:
+        for part in _profile_parts(profile_path):
+            os.remove(part)
+
+    if workers <= 1:
+        if profile_path is not None:
+            _profiler = cProfile.Profile()
+        try:
+            for i in positions:
+                yield _mincut(i)
+        finally:
+            _finish_mincuts()
+        return
+
+    positions = np.asarray(positions, dtype=np.int64)
+    pending = positions[np.argsort(-clusters.sizes()[positions], kind='stable')].tolist()
+    pending.reverse()
+    if memory_budget is None:
+        costs = np.zeros(len(clusters), dtype=np.int64)
+    else:
+        costs = realized_bytes(clusters.sizes(), ms)
+
+    try:
+        with ProcessPoolExecutor(
+            workers, mp_context=mp.get_context('fork'), initializer=_start_profile if profile_path is not None else None
+        ) as pool:
+            running = {}
+            in_use = 0
+            while pending or running:
+                while pending and len(running) < workers and (
+                    not running or memory_budget is None or in_use + costs[pending[-1]] <= memory_budget
+                ):
+                    i = pending.pop()
+                    running[pool.submit(_mincut, i)] = i
+                    in_use += costs[i]
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    in_use -= costs[running.pop(future)]
+                    yield future.result()
+    finally:
+        _finish_mincuts()
+
+
+def _finish_mincuts():
+    global _global_graph, _clusters, _profile_path, _profiler, _timeout
+    if _profiler is not None:
+        _dump_profile()
+    if _profile_path is not None:
+        _merge_profiles(_profile_path)
+    _global_graph = None
+    _clusters = None
+    _profile_path = None
+    _profiler = None
+    _timeout = None
@@ -0,0 +1,128 @@
+import numpy as np
+
+from dataclasses import dataclass
+
+
+@dataclass
+class EdgeScan:
+    ''' Per-cluster edge aggregates gathered in a single pass over the edge list
+
+    attributes
+    ----------
+    intra: number of edges with both endpoints in the cluster
+    boundary: number of edges with exactly one endpoint in the cluster
+    volume: sum of the global degrees of the cluster's nodes
+    m: number of edges in the global graph
+    '''
+    intra: np.ndarray
+    boundary: np.ndarray
+    volume: np.ndarray
+    m: int
+
+    def modularity(self):
+        ''' Same formula as Graph.modularity_of, for every cluster at once '''
+        return self.intra / self.m - (self.volume / (2 * self.m)) ** 2
+
+    def cpm(self, ns, resolution):
+        ''' Same formula as Graph.cpm, for every cluster at once '''
+        ns = np.asarray(ns, dtype=np.int64)
+        return self.intra - resolution * ns * (ns - 1) / 2
+
+    def conductance(self):
+        ''' Cut edges over the smaller of the cluster volume and its complement '''
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.boundary / np.minimum(self.volume, 2 * self.m - self.volume)
+
+    def coverage(self):
+        ''' Fraction of the graph's edges that fall inside a cluster '''
+        return self.intra.sum() / self.m if self.m > 0 else np.nan
+
+
+def scan_edges(labels, src, dst, num_clusters) -> EdgeScan:
+    ''' Aggregate intra-cluster edges, boundary edges and degree sums
+
+    parameters
+    ----------
+    labels: node -> cluster position array (see Clustering.labels)
+    src, dst: edge endpoint arrays (see graph_io.read_edge_arrays)
+    num_clusters: number of clusters
+    '''
+    return scan_labels(labels[src], labels[dst], src == dst, num_clusters)
+
+
+def scan_labels(src_labels, dst_labels, loops, num_clusters) -> EdgeScan:
+    ''' scan_edges on edges given by the cluster positions of their endpoints
+
+    parameters
+    ----------
+    src_labels, dst_labels: cluster position of each edge's endpoints, -1 for unclustered nodes
+    loops: whether each edge is a self-loop
+    num_clusters: number of clusters
+    '''
+    same = src_labels == dst_labels
+
+    intra = np.bincount(
+        src_labels[same & (src_labels >= 0)], minlength=num_clusters
+    )
+    boundary = (
+        np.bincount(src_labels[~same & (src_labels >= 0)], minlength=num_clusters)
+        + np.bincount(dst_labels[~same & (dst_labels >= 0)], minlength=num_clusters)
+    )
+
+    # networkit counts a self-loop only once towards its node's degree
+    volume = (
+        np.bincount(src_labels[src_labels >= 0], minlength=num_clusters)
+        + np.bincount(dst_labels[(dst_labels >= 0) & ~loops], minlength=num_clusters)
+    )
+
+    return EdgeScan(intra, boundary, volume, len(src_labels))
+
+
+def scan_clusterings(labels, num_clusters, src, dst, chunk_size=1 << 22):
+    ''' scan_edges for several clusterings of the same graph in one pass over the edge list
+
+    parameters
+    ----------
+    labels: node x clustering matrix of cluster positions (see clustering_io.label_matrix)
+    num_clusters: number of clusters in each clustering
+    src, dst: edge endpoint arrays (see graph_io.read_edge_arrays)
+    chunk_size: number of edges gathered at a time
+
+    returns
+    -------
+    One EdgeScan per clustering
+
+    Cluster positions are shifted so that the clusters of all clusterings
+    share one range, and every chunk of edges is counted for all
+    clusterings with a single bincount per aggregate.
+    '''
+    shift = np.zeros(len(num_clusters) + 1, dtype=np.int64)
+    np.cumsum(num_clusters, out=shift[1:])
+    total = int(shift[-1])
+    intra = np.zeros(total, dtype=np.int64)
+    boundary = np.zeros(total, dtype=np.int64)
+    volume = np.zeros(total, dtype=np.int64)
+
+    for start in range(0, len(src), chunk_size):
+        chunk_src = src[start:start + chunk_size]
+        chunk_dst = dst[start:start + chunk_size]
+        src_labels = labels[chunk_src]
+        dst_labels = labels[chunk_dst]
+        src_in = src_labels >= 0
+        dst_in = dst_labels >= 0
+        same = src_labels == dst_labels
+        src_shifted = src_labels + shift[:-1]
+        dst_shifted = dst_labels + shift[:-1]
+
+        intra += np.bincount(src_shifted[same & src_in], minlength=total)
+        boundary += np.bincount(src_shifted[~same & src_in], minlength=total)
+        boundary += np.bincount(dst_shifted[~same & dst_in], minlength=total)
+
+        # networkit counts a self-loop only once towards its node's degree
+        volume += np.bincount(src_shifted[src_in], minlength=total)
+        volume += np.bincount(dst_shifted[dst_in & (chunk_src != chunk_dst)[:, None]], minlength=total)
+
+    return [
+        EdgeScan(intra[shift[k]:shift[k + 1]], boundary[shift[k]:shift[k + 1]], volume[shift[k]:shift[k + 1]], len(src))
+        for k in range(len(num_clusters))
+    ]
@@ -1,35 +1,40 @@
 import typer
-import json
 
 import pandas as pd
 import numpy as np
 
 from os import path
 
-def compute_ratio(row):
-    ''' Compute the ratio of descendant size to input cluster size 
+from before_json import read_before
+
+def compute_ratio(table):
+    ''' Compute the ratio of descendant size to input cluster size, for every row at once
 
     rules
     -----
         - Degraded clusters have a size ratio of 0
         - Extant clusters have a size ratio of 1
     '''
-    if row['fate'] == 'degraded':
-        return 0
-    if row['extant']:
-        return 1
-    return int(row['descendant_cluster_size'])/int(row['input_cluster_size'])
-
-def calc_fate(row):
-    ''' Compute cluster fate
+    degraded = (table['fate'] == 'degraded').to_numpy()
+    extant = table['extant'].astype(bool).to_numpy()
+    divided = ~degraded & ~extant
+    if not divided.any():
+        # Without any actual ratio the column stays integer, as the row-wise version left it
+        return np.where(extant & ~degraded, 1, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = table['descendant_cluster_size'].to_numpy(dtype=float) / table['input_cluster_size'].to_numpy(dtype=float)
+    return np.select([degraded, extant], [0.0, 1.0], ratio)
+
+def calc_fate(table):
+    ''' Compute cluster fate, for every row at once
 
     parameters
     ----------
-    row: DataFrame row containing cluster information
+    table: DataFrame with extant and num_active_descendants columns
 
     returns
     -------
-    The cluster fate of the input cluster
+    The cluster fate of the input cluster of every row
 
     Cluster fate can be:
         - extant: The cluster wasn't touched by CM or post-CM filtration
@@ -37,53 +42,39 @@ def calc_fate(row):
         - reduced: The cluster was reduced in size by CM
         - split: The cluster resulted in multiple active descendant clusters
     '''
-    if row['extant']:
-        return 'extant'
-    
-    n = row['num_active_descendants']
-    if n == 0:
-        return 'degraded'
-    elif n == 1:
-        return 'reduced'
-    else:
-        return 'split'
+    n = table['num_active_descendants'].to_numpy()
+    fate = np.select(
+        [table['extant'].astype(bool).to_numpy(), n == 0, n == 1],
+        ['extant', 'degraded', 'reduced'],
+        'split'
+    )
+    return fate.astype(object)
 
-def main(
-    universal_before: str = typer.Option(..., "--universal-before", "-ub", 
-        help='The before.json file that resulted from CM2Universal'),
-    clustering_file: str = typer.Option(..., "--existing-clustering", "-e", 
-        help='Existing clustering: MUST be post-cm filtering'),
-    output_file: str = typer.Option("", "--output", "-o", 
-        help='(Optional) The name of the output file. Will default to being stored in the same directory as the existing clustering')
-):
-    # Handle empty output file
-    if output_file == "":
-        name, _ = path.splitext(clustering_file)
-        output_file = name + '_cluster_fate.csv'
-
-    # Construct cluster size table
-    clustering = pd.read_csv(clustering_file, header=None, names=['node_id', 'cluster_id'], sep='\t')
-    desc_cluster_sizes = clustering.groupby('cluster_id').size().reset_index(name='node_count')
+def fate_table(ub_data, clustering):
+    ''' Join CM2Universal's input clusters with the post-CM clusters they became
 
-    # Construct table from before.json
-    with open(universal_before) as json_file:
-        data = json.load(json_file)
-        ub_data = pd.DataFrame(data)
+    parameters
+    ----------
+    ub_data: before.json as a label, n, extant, descendants table (see before_json.read_before)
+    clustering: post-CM clustering as a node_id, cluster_id DataFrame
 
-    # Edge case: if no cluster was touched by CM, there may not be a descendants column
-    if 'descendants' not in ub_data.columns:
-        ub_data['descendants'] = np.empty((len(ub_data), 0)).tolist()
+    returns
+    -------
+    One row per (input cluster, active descendant) pair, with cluster fates and size ratios
+    '''
+    desc_cluster_sizes = clustering.groupby('cluster_id').size().reset_index(name='node_count')
 
     # Refine CM2Universal table
-    ub_data['input_cluster_size'] = ub_data['nodes'].apply(lambda x: len(x))
-    desc_cluster_ids = set(desc_cluster_sizes['cluster_id'].tolist())
-    ub_data['active_descendants'] = ub_data['descendants'].apply(lambda x: [elem for elem in x if elem in desc_cluster_ids])
-    ub_data['num_active_descendants'] = ub_data['active_descendants'].apply(lambda x: len(x))
-    ub_data['active_descendants'] = ub_data['active_descendants'].apply(lambda x: [None] if len(x) == 0 else x)
+    ub_data['input_cluster_size'] = ub_data['n']
+    descendants = ub_data['descendants'].explode()
+    active_descendants = descendants[descendants.isin(desc_cluster_sizes['cluster_id'])].rename('active_descendants')
+    ub_data['num_active_descendants'] = active_descendants.groupby(level=0).size().reindex(ub_data.index, fill_value=0)
 
-    # Drop unneeded fields and bring arrray columns into multiple rows
-    before_table = ub_data[['label', 'input_cluster_size', 'active_descendants', 'num_active_descendants', 'extant']]
-    before_table = before_table.explode('active_descendants').reset_index(drop=True)
+    # Drop unneeded fields and bring active descendants into multiple rows, one empty row for clusters without any
+    before_table = ub_data[['label', 'input_cluster_size', 'num_active_descendants', 'extant']]
+    before_table = before_table.join(active_descendants, how='left')
+    before_table = before_table[['label', 'input_cluster_size', 'active_descendants', 'num_active_descendants', 'extant']]
+    before_table = before_table.reset_index(drop=True)
 
     # Prevent errors on all extant clusterings by replacing none entries with nan
     before_table['active_descendants'].fillna(np.nan, inplace=True)
@@ -95,13 +86,34 @@ def main(
     final_table = final_table[final_table['extant'].notna()]
 
     # Calculate input cluster fate
-    final_table['fate'] = final_table.apply(calc_fate, axis=1)
+    final_table['fate'] = calc_fate(final_table)
 
     # Calculate size ratios
-    final_table['size_ratio'] = final_table.apply(compute_ratio, axis=1)
+    final_table['size_ratio'] = compute_ratio(final_table)
+
+    return final_table
+
+def main(
+    universal_before: str = typer.Option(..., "--universal-before", "-ub", 
+        help='The before.json file that resulted from CM2Universal'),
+    clustering_file: str = typer.Option(..., "--existing-clustering", "-e", 
+        help='Existing clustering: MUST be post-cm filtering'),
+    output_file: str = typer.Option("", "--output", "-o", 
+        help='(Optional) The name of the output file. Will default to being stored in the same directory as the existing clustering')
+):
+    # Handle empty output file
+    if output_file == "":
+        name, _ = path.splitext(clustering_file)
+        output_file = name + '_cluster_fate.csv'
+
+    # Construct cluster size table
+    clustering = pd.read_csv(clustering_file, header=None, names=['node_id', 'cluster_id'], sep='\t')
+
+    # Construct table from before.json, counting node lists without loading them
+    ub_data = read_before(universal_before)
 
     # Write to csv
-    final_table.to_csv(output_file, index=False)
+    fate_table(ub_data, clustering).to_csv(output_file, index=False)
 
 def entry_point():
     typer.run(main)
@@ -0,0 +1,363 @@
+import bz2
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import zipfile
+
+import networkit as nk
+import numpy as np
+import pandas as pd
+
+from dataclasses import dataclass
+
+from nk_binary import write_networkit_binary
+
+CACHE_VERSION = 1
+
+# Edge lists with these extensions are headerless little-endian int64 (u, v) pairs instead of text
+BINARY_EXTENSIONS = ('.bin',)
+
+# Bytes of text each worker parses at a time
+BLOCK_SIZE = 1 << 26
+
+
+@dataclass
+class LoadedGraph:
+    ''' A global graph together with its edge arrays
+
+    attributes
+    ----------
+    graph: networkit graph with the same nodes and edges as what
+        EdgeListReader("\\t", 0) builds, unless node IDs were compacted
+    src, dst: edge endpoint arrays, one entry per edge (see read_edge_arrays)
+    fingerprint: content hash of the edge list the graph was loaded from
+    node_ids: original ID of every node when IDs were compacted (see
+        load_graph), None when original IDs are used as node indices
+    '''
+    graph: nk.Graph
+    src: np.ndarray
+    dst: np.ndarray
+    fingerprint: str
+    node_ids: np.ndarray = None
+
+    def compact_ids(self, ids):
+        ''' Node indices of original node IDs
+
+        IDs that the edge list does not have, such as nodes that only appear
+        in a clustering, get new isolated nodes at the end of the graph.
+        '''
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.node_ids is None:
+            return ids
+
+        nodes = _lookup(self.node_ids, ids)
+        missing = np.unique(ids[nodes < 0])
+        if len(missing) > 0:
+            self.graph.addNodes(len(missing))
+            self.node_ids = np.concatenate([self.node_ids, missing])
+            nodes = _lookup(self.node_ids, ids)
+        return nodes
+
+    def original_ids(self, nodes):
+        ''' Original node IDs of node indices '''
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if self.node_ids is None:
+            return nodes
+        return self.node_ids[nodes]
+
+
+def _lookup(node_ids, ids):
+    ''' Position of each of ids in node_ids, -1 if absent '''
+    order = np.argsort(node_ids, kind='stable')
+    sorted_ids = node_ids[order]
+    found = np.searchsorted(sorted_ids, ids)
+    found[found == len(sorted_ids)] = 0
+    hit = (len(sorted_ids) > 0) & (sorted_ids[found] == ids)
+    return np.where(hit, order[found], -1)
+
+
+def build_graph(n, src, dst, chunk_size=1 << 20):
+    ''' Build an undirected networkit graph with n nodes from edge arrays, one edge at a time (see read_graph for large graphs) '''
+    graph = nk.Graph(n)
+    add_edge = graph.addEdge
+    for start in range(0, len(src), chunk_size):
+        for u, v in zip(src[start:start + chunk_size].tolist(), dst[start:start + chunk_size].tolist()):
+            add_edge(u, v)
+    return graph
+
+
+def read_graph(n, src, dst, filepath=None, workers=1):
+    ''' Build an undirected networkit graph with n nodes from canonical edge arrays
+
+    The graph is written in networkit's binary format to filepath (a
+    temporary file if None) and read back by NetworkitBinaryReader, which
+    is much faster than inserting the edges from Python.
+    '''
+    if filepath is not None:
+        write_networkit_binary(filepath, n, src, dst, workers)
+        return nk.graphio.NetworkitBinaryReader().read(filepath)
+
+    with tempfile.TemporaryDirectory(prefix='graph_') as directory:
+        return read_graph(n, src, dst, os.path.join(directory, 'graph.nkb'), workers)
+
+
+def is_binary(filepath):
+    return filepath.endswith(BINARY_EXTENSIONS)
+
+
+def open_edge_list(filepath):
+    ''' Open a text edge list for reading bytes, decompressing .gz, .bz2, .xz, .zst and single-file .zip files on the fly '''
+    if filepath.endswith('.gz'):
+        return gzip.open(filepath, 'rb')
+    if filepath.endswith('.bz2'):
+        return bz2.open(filepath, 'rb')
+    if filepath.endswith('.xz'):
+        return lzma.open(filepath, 'rb')
+    if filepath.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Reading .zst edge lists needs the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(open(filepath, 'rb'), closefd=True)
+    if filepath.endswith('.zip'):
+        with zipfile.ZipFile(filepath) as archive:
+            names = archive.namelist()
+            if len(names) != 1:
+                raise ValueError(f"{filepath} should hold exactly one edge list, not {len(names)} files")
+            # The member keeps its own reference to the archive's file, which it closes with the member
+            return archive.open(names[0])
+    return open(filepath, 'rb')
+
+
+def iter_text_blocks(filepath, block_size=BLOCK_SIZE):
+    ''' Read a text edge list block_size bytes at a time, cut after the last complete line of each block '''
+    with open_edge_list(filepath) as f:
+        tail = b''
+        while True:
+            data = f.read(block_size)
+            if not data:
+                break
+            block = tail + data
+            cut = block.rfind(b'\n') + 1
+            if cut == 0:
+                tail = block
+                continue
+            tail = block[cut:]
+            yield block[:cut]
+        if tail:
+            yield tail
+
+
+def parse_edges(source):
+    ''' Endpoint arrays of the edges in tab-separated text (bytes or a binary file object), '#' lines being comments '''
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    try:
+        edges = pd.read_csv(
+            source, sep='\t', header=None, comment='#', usecols=[0, 1], dtype=np.int64
+        ).to_numpy()
+    except pd.errors.EmptyDataError:
+        edges = np.empty((0, 2), dtype=np.int64)
+    return edges[:, 0], edges[:, 1]
+
+
+def read_raw_edges(filepath, workers=1):
+    ''' Read an edge list into (src, dst) arrays as it is in the file
+
+    parameters
+    ----------
+    filepath: a tab-separated edge list, possibly compressed (see
+        open_edge_list), or a binary one (see BINARY_EXTENSIONS)
+    workers: number of processes to parse text with, in blocks of BLOCK_SIZE
+        bytes; decompression happens in the parent while workers parse
+    '''
+    if is_binary(filepath):
+        edges = np.fromfile(filepath, dtype='<i8').reshape(-1, 2)
+        return edges[:, 0], edges[:, 1]
+
+    if workers <= 1:
+        with open_edge_list(filepath) as f:
+            return parse_edges(f)
+
+    with mp.get_context('fork').Pool(workers) as pool:
+        parts = list(pool.imap(parse_edges, iter_text_blocks(filepath)))
+    if not parts:
+        return parse_edges(b'')
+    return np.concatenate([src for src, _ in parts]), np.concatenate([dst for _, dst in parts])
+
+
+def read_edge_arrays(filepath, workers=1):
+    ''' Read an edge list into canonical (src, dst) NumPy arrays
+
+    The arrays describe the same graph that nk.graphio.EdgeListReader("\\t", 0)
+    builds: node IDs are used as indices, '#' lines are comments, duplicate
+    edges (in either direction) are dropped and self-loops are kept. See
+    read_raw_edges for the formats and workers.
+    '''
+    return canonical_edges(*read_raw_edges(filepath, workers))
+
+
+def canonical_edges(src, dst):
+    ''' Orient every edge as (low, high), drop duplicates and sort '''
+    low = np.minimum(src, dst)
+    high = np.maximum(src, dst)
+    if len(high) == 0:
+        return low, high
+
+    n = int(high.max()) + 1
+    if n > 3037000499:
+        # low * n + high would overflow int64 for IDs this large
+        pairs = np.unique(np.stack([low, high], axis=1), axis=0)
+        return pairs[:, 0], pairs[:, 1]
+    keys = np.unique(low * n + high)
+    return keys // n, keys % n
+
+
+def file_hash(filepath, chunk_size=1 << 24):
+    ''' BLAKE2b digest of a file's contents '''
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_dir(filepath, compact=False):
+    return filepath + ('.compact.cache' if compact else '.cache')
+
+
+def compact_edges(src, dst):
+    ''' Renumber the nodes of canonical edge arrays densely, returning (node_ids, src, dst)
+
+    node_ids holds the original ID of every new node index. It is sorted, so
+    the renumbering keeps every edge oriented and the edges sorted.
+    '''
+    node_ids = np.unique(np.concatenate([src, dst]))
+    return node_ids, np.searchsorted(node_ids, src), np.searchsorted(node_ids, dst)
+
+
+def load_graph(filepath, cache=True, compact=False, workers=1) -> LoadedGraph:
+    ''' Load an edge list, going through the binary cache if possible
+
+    parameters
+    ----------
+    filepath: the edge list, tab-separated text (possibly compressed) or binary
+        (see read_raw_edges)
+    cache: whether to read and write the cache directory next to the edge list
+    compact: number nodes 0..n-1 in order of their IDs instead of using IDs as
+        indices, so sparse IDs do not allocate nodes up to the largest one;
+        LoadedGraph.compact_ids and original_ids map between the two
+    workers: number of processes to parse the edge list and encode the graph with
+
+    networkit never parses the edge list: it is read into edge arrays, and
+    the graph is built from them through networkit's binary format (see
+    read_graph).
+
+    The cache holds the graph in networkit's binary format plus the edge
+    arrays as a CSR (indptr.npy, indices.npy) that gets memory-mapped. It is
+    keyed by the edge list's size and mtime; if only the mtime changed, the
+    content hash decides whether the cache is still valid.
+    '''
+    stat = os.stat(filepath)
+    directory = cache_dir(filepath, compact)
+
+    fingerprint = None
+    if cache:
+        meta = _read_cache_meta(directory)
+        if meta is not None and meta['size'] == stat.st_size:
+            if meta['mtime_ns'] != stat.st_mtime_ns:
+                fingerprint = file_hash(filepath)
+                if fingerprint == meta['hash']:
+                    meta['mtime_ns'] = stat.st_mtime_ns
+                    try:
+                        _write_cache_meta(directory, meta)
+                    except OSError:
+                        pass
+            if meta['mtime_ns'] == stat.st_mtime_ns:
+                return _read_cache(directory, meta)
+
+    src, dst = read_edge_arrays(filepath, workers)
+    if compact:
+        node_ids, src, dst = compact_edges(src, dst)
+        n = len(node_ids)
+    else:
+        # Like EdgeListReader, every ID up to the largest one is a node
+        node_ids = None
+        n = int(dst.max()) + 1 if len(dst) > 0 else 0
+
+    if fingerprint is None:
+        fingerprint = file_hash(filepath)
+
+    if cache:
+        try:
+            meta = _write_cache(directory, n, src, dst, node_ids, {
+                'version': CACHE_VERSION,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'hash': fingerprint,
+            }, workers)
+            return _read_cache(directory, meta)
+        except OSError as e:
+            print(f"Could not write graph cache to {directory}: {e}")
+
+    return LoadedGraph(read_graph(n, src, dst, workers=workers), src, dst, fingerprint, node_ids)
+
+
+def _read_cache_meta(directory):
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != CACHE_VERSION:
+        return None
+    return meta
+
+
+def _write_cache_meta(directory, meta):
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=4)
+
+
+def _read_cache(directory, meta) -> LoadedGraph:
+    graph = nk.graphio.NetworkitBinaryReader().read(os.path.join(directory, 'graph.nkb'))
+    indptr = np.load(os.path.join(directory, 'indptr.npy'), mmap_mode='r')
+    dst = np.load(os.path.join(directory, 'indices.npy'), mmap_mode='r')
+    src = np.repeat(np.arange(len(indptr) - 1, dtype=np.int64), np.diff(indptr))
+    node_ids = None
+    if meta.get('compact'):
+        node_ids = np.load(os.path.join(directory, 'node_ids.npy'))
+    return LoadedGraph(graph, src, dst, meta['hash'], node_ids)
+
+
+def _write_cache(directory, n, src, dst, node_ids, meta, workers=1):
+    ''' Write the cache into a scratch directory and move it into place, returning its metadata '''
+    scratch = directory + f'.tmp{os.getpid()}'
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+
+    # Edges are sorted by source, so the CSR row pointer is a cumulative degree count
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    meta = {**meta, 'n': n, 'm': len(src), 'compact': node_ids is not None}
+
+    try:
+        np.save(os.path.join(scratch, 'indptr.npy'), indptr)
+        np.save(os.path.join(scratch, 'indices.npy'), np.asarray(dst, dtype=np.int64))
+        write_networkit_binary(os.path.join(scratch, 'graph.nkb'), n, src, dst, workers)
+        if node_ids is not None:
+            np.save(os.path.join(scratch, 'node_ids.npy'), node_ids)
+        _write_cache_meta(scratch, meta)
+    except OSError:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(scratch, directory)
+    return meta
@@ -0,0 +1,88 @@
+import numpy as np
+
+from edge_scan import EdgeScan
+from graph_io import canonical_edges, read_raw_edges
+
+
+def contains_edges(src, dst, u, v):
+    ''' Whether each edge (u[i], v[i]) is one of the canonical edges src, dst
+
+    Every edge is binary searched for among the edges of its lower
+    endpoint, all edges at once, so the graph's edge arrays are neither
+    copied nor hashed.
+    '''
+    lo = np.searchsorted(src, u, side='left')
+    end = np.searchsorted(src, u, side='right')
+    hi = end.copy()
+    active = lo < hi
+    while active.any():
+        mid = (lo + hi) // 2
+        below = np.zeros(len(u), dtype=bool)
+        below[active] = dst[mid[active]] < v[active]
+        lo = np.where(active & below, mid + 1, lo)
+        hi = np.where(active & ~below, mid, hi)
+        active = lo < hi
+    found = lo < end
+    found[found] = dst[lo[found]] == v[found]
+    return found
+
+
+def read_delta(filepath, loaded, workers=1):
+    ''' The edges of an edge-delta file that the loaded graph does not have yet
+
+    returns
+    -------
+    (src, dst, known) with the new edges as canonical edge arrays (see
+    graph_io.canonical_edges) and the number of distinct delta edges the
+    graph already has
+    '''
+    src, dst = canonical_edges(*read_raw_edges(filepath, workers))
+    known = contains_edges(loaded.src, loaded.dst, src, dst)
+    return src[~known], dst[~known], int(known.sum())
+
+
+def add_scans(scan, delta) -> EdgeScan:
+    ''' The EdgeScan of a graph plus edges it did not have, from the scans of both '''
+    return EdgeScan(scan.intra + delta.intra, scan.boundary + delta.boundary, scan.volume + delta.volume, scan.m + delta.m)
+
+
+def check_previous(previous, clusters, n, m, columns):
+    ''' Raise ValueError unless previous is a complete stats table of clusters on a network with n nodes and m edges '''
+    if previous.columns.tolist() != columns:
+        raise ValueError(f"The previous stats have columns {previous.columns.tolist()}, expected {columns}; pass the same -g and -n as for them")
+
+    rows = previous.iloc[:-1]
+    overall = previous.iloc[-1]
+    if (
+        overall['cluster'] != 'Overall'
+        or rows['cluster'].tolist() != [str(i) for i in clusters.ids]
+        or rows['n'].tolist() != clusters.sizes().tolist()
+    ):
+        raise ValueError("The previous stats were computed for a different clustering")
+    if int(overall['n']) != n or int(overall['m']) != m:
+        raise ValueError(f"The previous stats were computed on a network with {int(overall['n'])} nodes and {int(overall['m'])} edges, not on this one with {n} nodes and {m} edges")
+    if rows['connectivity'].isna().any():
+        raise ValueError("The previous stats lack some mincuts (--sample or --mincut-timeout), run stats.py on the updated network instead")
+
+
+def still_exact(clusters, labels, src, dst, previous):
+    ''' Whether each cluster's previous mincut is still its mincut after it gained internal edges
+
+    parameters
+    ----------
+    clusters: Clustering of the clusters that gained edges
+    labels: node -> cluster position array (see Clustering.labels)
+    src, dst: edge endpoint arrays of the updated graph, or at least of every
+        internal edge of clusters
+    previous: mincut of each cluster before the new edges
+
+    Adding edges never makes a cut smaller, so the mincut is at least the
+    previous one, and it is at most the minimum internal degree. A cluster
+    whose minimum internal degree is still its previous mincut thus keeps
+    that mincut without viecut.
+    '''
+    src_labels = labels[src]
+    intra = (src_labels >= 0) & (src_labels == labels[dst]) & (src != dst)
+    degree = np.bincount(src[intra], minlength=len(labels)) + np.bincount(dst[intra], minlength=len(labels))
+    min_degree = np.minimum.reduceat(degree[clusters.nodes], clusters.offsets[:-1])
+    return min_degree == previous
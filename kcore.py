@@ -0,0 +1,98 @@
+import networkit as nk
+import numpy as np
+
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from clustering_io import Clustering
+from graph_io import build_graph
+
+
+def cluster_modularity(members, component, src, dst, degree, m):
+    ''' Modularity contribution ls / L - (ds / 2L)^2 of each component, as IKC scores its clusters
+
+    parameters
+    ----------
+    members: nodes of the components
+    component: component index of each of members
+    src, dst: edges of the whole graph, without self-loops
+    degree: node degrees in the whole graph
+    m: number of edges of the whole graph
+    '''
+    count = int(component.max()) + 1 if len(component) else 0
+    labels = np.full(len(degree), -1, dtype=np.int64)
+    labels[members] = component
+    src_labels = labels[src]
+    intra = (src_labels >= 0) & (src_labels == labels[dst])
+    ls = np.bincount(src_labels[intra], minlength=count)
+    ds = np.bincount(component, weights=degree[members], minlength=count)
+    return ls / m - (ds / (2 * m)) ** 2
+
+
+def iterative_kcore(n, src, dst, k):
+    ''' Iterative k-core clustering (IKC) of a graph given by edge arrays
+
+    parameters
+    ----------
+    n: number of nodes
+    src, dst: edge arrays (see graph_io.canonical_edges)
+    k: smallest core number a cluster may have
+
+    returns
+    -------
+    (clusters, cores, modularities) where clusters is a Clustering with IDs
+    1, 2, ... in the order IKC reports them, and cores and modularities are
+    the core number and modularity of each cluster
+
+    Each round takes the nodes of the largest core number of what is left
+    of the graph, reports every connected component among them that has
+    positive modularity in the whole graph, and removes them all. This
+    stops once the largest core number is below k.
+    '''
+    loops = src == dst
+    src, dst = src[~loops], dst[~loops]
+    m = len(src)
+    degree = np.bincount(src, minlength=n) + np.bincount(dst, minlength=n)
+    alive = np.ones(n, dtype=bool)
+    remaining = np.ones(m, dtype=bool)
+
+    nodes, sizes, cores, modularities = [], [], [], []
+    while m > 0 and alive.any():
+        graph = build_graph(n, src[remaining], dst[remaining])
+        scores = np.asarray(nk.centrality.CoreDecomposition(graph).run().scores(), dtype=np.int64)
+        scores[~alive] = -1
+        core = int(scores.max())
+        if core < max(k, 1):
+            break
+
+        top = scores == core
+        inside = top[src] & top[dst]
+        _, component = connected_components(
+            coo_matrix((np.ones(int(inside.sum()), dtype=np.int8), (src[inside], dst[inside])), shape=(n, n)),
+            directed=False
+        )
+        members = np.flatnonzero(top)
+        # Number components by their smallest node, which scipy's labels already follow
+        _, component = np.unique(component[members], return_inverse=True)
+        modularity = cluster_modularity(members, component, src, dst, degree, m)
+
+        order = np.argsort(component, kind='stable')
+        counts = np.bincount(component)
+        for c in np.flatnonzero(modularity > 0):
+            start = counts[:c].sum()
+            nodes.append(members[order[start:start + counts[c]]])
+            sizes.append(counts[c])
+            cores.append(core)
+            modularities.append(modularity[c])
+
+        alive[members] = False
+        remaining &= alive[src] & alive[dst]
+
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    clusters = Clustering(
+        np.arange(1, len(sizes) + 1, dtype=object),
+        np.concatenate(nodes) if nodes else np.zeros(0, dtype=np.int64),
+        offsets
+    )
+    return clusters, np.asarray(cores, dtype=np.int64), np.asarray(modularities, dtype=np.float64)
@@ -1,16 +1,14 @@
+import csv
 import typer
-import networkit as nk
 import pandas as pd
 import os
 
+from dataclasses import replace
 from enum import Enum
-from numpy import log10
 
-from hm01.clusterers.abstract_clusterer import AbstractClusterer
-from hm01.clusterers.ikc_wrapper import IkcClusterer
-from hm01.clusterers.leiden_wrapper import LeidenClusterer, Quality
-from hm01.graph import Graph, IntangibleSubgraph, RealizedSubgraph
-from hm01.mincut import viecut
+from clustering_io import load_clustering
+from graph_io import load_graph
+from truss import cluster_ktrusses
 
 class ClustererSpec(str, Enum):
     """ (VR) Container for Clusterer Specification """  
@@ -18,70 +16,64 @@ class ClustererSpec(str, Enum):
     ikc = "ikc"
     leiden_mod = "leiden_mod"
 
+def match_k_vals(stats, ids):
+    ''' Max k-truss value of each cluster in ids, looked up by cluster ID in a stats table '''
+    column = 'max_ktruss' if 'max_ktruss' in stats.columns else 'ktruss_vals'
+    rows = stats[stats['cluster'] != 'Overall']
+    # The "Overall" row makes the column float, so cast the per-cluster values back
+    k_by_id = dict(zip(rows['cluster'], rows[column].astype(int)))
+    missing = [cluster_id for cluster_id in ids if cluster_id not in k_by_id]
+    if missing:
+        raise ValueError(f"The stats have no row for {len(missing)} of the clusters, e.g. {missing[0]}")
+    return [k_by_id[cluster_id] for cluster_id in ids]
+
 def main(
     input: str = typer.Option(..., "--input", "-i"),
     existing_clustering: str = typer.Option(..., "--existing-clustering", "-e"),
-    clusterer_spec: ClustererSpec = typer.Option(..., "--clusterer", "-c"),
+    clusterer_spec: ClustererSpec = typer.Option(..., "--clusterer", "-c",
+        help='Ignored, like -k and -g: kept so that stats.py commands work unchanged'),
     k: int = typer.Option(-1, "--k", "-k"),
     resolution: float = typer.Option(-1, "--resolution", "-g"),
-
+    workers: int = typer.Option(1, "--workers"),
+    cache: bool = typer.Option(True, "--cache/--no-cache"),
+    compact_ids: bool = typer.Option(False, "--compact-ids",
+        help='Number nodes densely instead of by ID, for edge lists with sparse or huge node IDs')
 ): 
     base, ext = os.path.splitext(existing_clustering)
     outfile = base + '_stats.csv'
 
-    df = pd.read_csv(outfile)
-    k_vals = list(df['ktruss_vals'])
+    # Cluster IDs stay strings, exactly as in the clustering, so that they match clusters.ids
+    df = pd.read_csv(outfile, dtype={'cluster': str}, keep_default_na=False, na_values={'max_ktruss': [''], 'ktruss_vals': ['']})
 
     outfile = base + '_ktruss.csv'
 
     print("Loading clusters...")
-    # (VR) Check -g and -k parameters for Leiden and IKC respectively
-    if clusterer_spec == ClustererSpec.leiden:
-        assert resolution != -1, "Leiden requires resolution"
-        clusterer = LeidenClusterer(resolution)
-    elif clusterer_spec == ClustererSpec.leiden_mod:
-        assert resolution == -1, "Leiden with modularity does not support resolution"
-        clusterer = LeidenClusterer(resolution, quality=Quality.modularity)
-    else:
-        assert k != -1, "IKC requires k"
-        clusterer = IkcClusterer(k)
-
-    clusters = clusterer.from_existing_clustering(existing_clustering)
-    ids = [cluster.index for cluster in clusters]
-    ns = [cluster.n() for cluster in clusters]
+    clusters = load_clustering(existing_clustering).without_singletons()
+    try:
+        k_vals = match_k_vals(df, clusters.ids.tolist())
+    except ValueError as e:
+        print(e)
+        raise typer.Exit(1)
     print("Done")
 
     print("Loading graph...")
     # (VR) Load full graph into Graph object
-    edgelist_reader = nk.graphio.EdgeListReader("\t", 0)
-    nk_graph = edgelist_reader.read(input)
-
-    global_graph = Graph(nk_graph, "")
-    ms = [cluster.count_edges(global_graph) for cluster in clusters]
-    print("Done")
-
-    print("Realizing clusters...")
-    clusters = [cluster.realize(global_graph) for cluster in clusters]
+    loaded = load_graph(input, cache, compact_ids, workers)
+    if compact_ids:
+        clusters = replace(clusters, nodes=loaded.compact_ids(clusters.nodes))
     print("Done")
 
     print("Getting k-truss nodes...")
-    ktruss_nodes = [cluster.retrieve_ktruss_nodes(k_vals[i]) for i, cluster in enumerate(clusters)]
-    print("Done")
-
-    print("Reformatting lists...")
-    col_1 = []
-    col_2 = []
-    col_3 = []
-    for i, ktruss_l in enumerate(ktruss_nodes):
-        col_1 = col_1 + [clusters[i].index for _ in range(len(ktruss_l))]
-        col_2 = col_2 + [k_vals[i] for _ in range(len(ktruss_l))]
-        col_3 = col_3 + ktruss_l
-    print("Done")
-
-    print("Writing to output file...")
-    df = pd.DataFrame(list(zip(col_1, col_2, col_3)),
-               columns =['cluster', 'ktruss_vals', 'ktruss_nodes'])
-    df.to_csv(outfile, index=False)
+    ktrusses = cluster_ktrusses(clusters, clusters.labels(loaded.graph.numberOfNodes()), loaded.src, loaded.dst)
+    stale = [i for i in range(len(clusters)) if ktrusses.max_k[i] != k_vals[i]]
+    if stale:
+        print(f"The stats give {len(stale)} clusters a different max k-truss than this network, e.g. cluster {clusters.ids[stale[0]]}: {k_vals[stale[0]]} instead of {ktrusses.max_k[stale[0]]}")
+        raise typer.Exit(1)
+    with open(outfile, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['cluster', 'ktruss_vals', 'ktruss_nodes'])
+        for i in range(len(clusters)):
+            writer.writerows((clusters.ids[i], int(ktrusses.max_k[i]), node) for node in loaded.original_ids(ktrusses.members(i)).tolist())
     print("Done")
 
 
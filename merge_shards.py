@@ -0,0 +1,77 @@
+import os
+
+import pandas as pd
+import typer
+
+from checkpoint import read_rows, with_overall
+from sharding import read_shard_metas, shard_path
+from stats import output_path, overall_row, write_universal_outputs
+
+
+def merge_shards(outfile, clean=False) -> pd.DataFrame:
+    ''' Combine the partial stats CSVs of every shard of outfile into outfile
+
+    parameters
+    ----------
+    outfile: the stats CSV the shards were computed for
+    clean: remove the partial CSVs and their sidecars once merged
+
+    Every shard must have finished, all shards must come from the same
+    clustering and graph, and together they must cover every cluster
+    exactly once. Rows are put back in cluster order and the "Overall" row
+    is recomputed, so the result is the same as that of an unsharded run.
+    '''
+    metas = read_shard_metas(outfile)
+    first = metas[0]
+
+    partials = []
+    positions = []
+    for meta in metas:
+        partial = shard_path(outfile, meta['shard'], meta['shards'])
+        df = read_rows(partial).iloc[:-1]
+        if len(df) != len(meta['positions']):
+            raise ValueError(f"{partial} has {len(df)} rows but its shard has {len(meta['positions'])} clusters")
+        partials.append(df)
+        positions.extend(meta['positions'])
+
+    df = pd.concat(partials)
+    df.index = positions
+    df = df.sort_index()
+
+    columns = first['columns']
+    cpms = df['cpm_score'].tolist() if 'cpm_score' in columns else None
+    df = with_overall(df, overall_row(columns, first['n'], first['m'], df['modularity'].tolist(), cpms))
+    df.to_csv(outfile, index=False)
+
+    if clean:
+        for meta in metas:
+            partial = shard_path(outfile, meta['shard'], meta['shards'])
+            os.remove(partial)
+            os.remove(partial + '.json')
+
+    return df
+
+def main(
+    existing_clustering: str = typer.Option(..., "--existing-clustering", "-e"),
+    output: str = typer.Option("", "--output", "-o"),
+    universal_before: str = typer.Option("", "--universal-before", "-ub"),
+    clean: bool = typer.Option(False, "--clean", help='Remove the partial CSVs once merged')
+):
+    outfile = output_path(existing_clustering, output)
+
+    print("Merging shards...")
+    try:
+        df = merge_shards(outfile, clean)
+    except ValueError as e:
+        print(e)
+        raise typer.Exit(1)
+    print(f"Wrote {len(df) - 1} clusters to {outfile}")
+
+    if len(universal_before) > 0:
+        write_universal_outputs(universal_before, outfile, df['cluster'].tolist(), df['n'].tolist())
+
+def entry_point():
+    typer.run(main)
+
+if __name__ == "__main__":
+    entry_point()
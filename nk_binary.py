@@ -0,0 +1,115 @@
+import multiprocessing as mp
+import struct
+
+import numpy as np
+
+# Layout of networkit's binary graph format (nkbg003), see networkit/io/NetworkitBinaryGraph.hpp
+MAGIC = b'nkbg003\x00'
+HEADER = struct.Struct('<11Q')
+CHUNKS = 32
+
+# Set in the parent before forking, so workers encode chunks of the same lists without copying them
+_lists = None
+
+
+def encode_varints(values):
+    ''' networkit's varint encoding (nkbg::varIntEncode) of every value, concatenated
+
+    The lowest set bit of the first byte gives the number of data bytes
+    that follow, the remaining bits of the first byte hold the lowest bits
+    of the value, and the data bytes hold the rest in little endian.
+    '''
+    values = np.asarray(values, dtype=np.uint64)
+    if (values >= np.uint64(1 << 56)).any():
+        raise ValueError("Node IDs must be below 2^56")
+
+    extra = np.zeros(len(values), dtype=np.uint64)
+    for k in range(1, 8):
+        extra += values >= np.uint64(1 << (7 * k))
+    ends = np.cumsum(extra + np.uint64(1)).astype(np.int64)
+    starts = ends - extra.astype(np.int64) - 1
+
+    out = np.empty(ends[-1] if len(ends) else 0, dtype=np.uint8)
+    out[starts] = ((np.uint64(1) << extra) | ((values << (extra + np.uint64(1))) & np.uint64(0xFF))).astype(np.uint8)
+    rest = values >> (np.uint64(7) - extra)
+    for k in range(1, int(extra.max(initial=0)) + 1):
+        more = extra >= k
+        out[starts[more] + k] = ((rest[more] >> np.uint64(8 * (k - 1))) & np.uint64(0xFF)).astype(np.uint8)
+    return out
+
+
+def _encode_chunk(args):
+    ''' Degree followed by neighbors for every node of a chunk of one of _lists '''
+    which, first, last = args
+    indptr, neighbors = _lists[which]
+    lo, hi = indptr[first], indptr[last]
+    values = np.empty(last - first + hi - lo, dtype=np.uint64)
+    heads = np.arange(last - first) + indptr[first:last] - lo
+    values[heads] = np.diff(indptr[first:last + 1])
+    entries = np.ones(len(values), dtype=bool)
+    entries[heads] = False
+    values[entries] = neighbors[lo:hi]
+    return encode_varints(values).tobytes()
+
+
+def _csr(n, owners, neighbors):
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owners, minlength=n), out=indptr[1:])
+    return indptr, neighbors
+
+
+def write_networkit_binary(filepath, n, src, dst, workers=1):
+    ''' Write an undirected graph given by canonical edge arrays in networkit's binary format
+
+    parameters
+    ----------
+    filepath: where to write the graph
+    n: number of nodes
+    src, dst: edge arrays as made by graph_io.canonical_edges (src <= dst, sorted, no duplicates)
+    workers: number of processes to encode the adjacency lists with
+
+    The file is what NetworkitBinaryWriter writes for the graph built by
+    adding these edges in order, so NetworkitBinaryReader reads it back
+    without networkit ever parsing text or inserting edges one by one.
+    Every node stores its neighbors v <= u in the adjacency lists and its
+    neighbors v >= u in the transposed lists, so self-loops are in both.
+    '''
+    global _lists
+    chunks = max(1, min(CHUNKS, n))
+    firsts = [i * (n // chunks) for i in range(chunks)] + [n]
+
+    # Canonical edges are sorted by src, so only the lists keyed by dst need sorting
+    if n <= 3037000499:
+        below = np.sort(dst * n + src) % n
+    else:
+        below = src[np.argsort(dst, kind='stable')]
+    _lists = [_csr(n, dst, below), _csr(n, src, dst)]
+    jobs = [(which, firsts[i], firsts[i + 1]) for which in range(2) for i in range(chunks)]
+    try:
+        if workers > 1:
+            with mp.get_context('fork').Pool(workers) as pool:
+                encoded = pool.map(_encode_chunk, jobs)
+        else:
+            encoded = [_encode_chunk(job) for job in jobs]
+    finally:
+        _lists = None
+
+    base = np.ones(n, dtype=np.uint8).tobytes() + np.asarray(firsts[1:-1], dtype='<u8').tobytes()
+    sections = []
+    for which in range(2):
+        parts = encoded[which * chunks:(which + 1) * chunks]
+        ends = np.cumsum([len(part) for part in parts])
+        sections.append(
+            [np.asarray(ends[:-1], dtype='<u8').tobytes(), struct.pack('<Q', len(src))] + parts
+        )
+
+    offset_base = len(MAGIC) + HEADER.size
+    offset_adjacency = offset_base + len(base)
+    offset_transpose = offset_adjacency + sum(len(part) for part in sections[0])
+    with open(filepath, 'wb') as f:
+        f.write(MAGIC)
+        f.write(HEADER.pack(0, 0, n, chunks, offset_base, offset_adjacency, offset_transpose, 0, 0, 0, 0))
+        f.write(base)
+        for section in sections:
+            for part in section:
+                f.write(part)
@@ -0,0 +1,103 @@
+import json
+import resource
+import time
+
+import numpy as np
+import psutil
+
+from contextlib import contextmanager
+
+
+def peak_rss_mb():
+    ''' Peak resident set size of this process and of its largest reaped child process, in MB '''
+    # ru_maxrss is reported in kilobytes on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return own, children
+
+
+def cpu_seconds():
+    ''' CPU time (user + system) used so far by this process and by its reaped child processes '''
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class Profiler:
+    ''' Wall time, CPU time and memory of each phase of a run, plus per-cluster mincut timings
+
+    Phases are timed with the phase() context manager and mincuts are
+    recorded one by one with mincut(). report() turns both into a dict that
+    write() saves as JSON.
+
+    parameters
+    ----------
+    slowest: number of slowest clusters listed in the report
+    '''
+    def __init__(self, slowest=20):
+        self.slowest = slowest
+        self.phases = []
+        self.mincuts = []
+        self.start = time.perf_counter()
+        self.process = psutil.Process()
+
+    @contextmanager
+    def phase(self, name):
+        wall = time.perf_counter()
+        cpu = cpu_seconds()
+        try:
+            yield
+        finally:
+            own, children = peak_rss_mb()
+            self.phases.append({
+                'phase': name,
+                'wall_s': time.perf_counter() - wall,
+                'cpu_s': cpu_seconds() - cpu,
+                'rss_mb': self.process.memory_info().rss / 2**20,
+                'peak_rss_mb': own,
+                'children_peak_rss_mb': children,
+            })
+
+    def mincut(self, cluster, n, m, realize_s, cut_s):
+        self.mincuts.append((cluster, n, m, realize_s, cut_s))
+
+    def report(self):
+        own, children = peak_rss_mb()
+        report = {
+            'wall_s': time.perf_counter() - self.start,
+            'peak_rss_mb': own,
+            'children_peak_rss_mb': children,
+            'phases': self.phases,
+        }
+
+        if self.mincuts:
+            realize = np.array([row[3] for row in self.mincuts])
+            cut = np.array([row[4] for row in self.mincuts])
+            report['mincut'] = {
+                'clusters': len(self.mincuts),
+                'realize_s': _distribution(realize),
+                'viecut_s': _distribution(cut),
+                'slowest': [
+                    {'cluster': cluster, 'n': n, 'm': m, 'realize_s': realize_s, 'viecut_s': cut_s}
+                    for cluster, n, m, realize_s, cut_s in sorted(
+                        self.mincuts, key=lambda row: row[3] + row[4], reverse=True
+                    )[:self.slowest]
+                ],
+            }
+        return report
+
+    def write(self, filepath):
+        with open(filepath, 'w') as f:
+            json.dump(self.report(), f, indent=4)
+
+
+def _distribution(seconds):
+    quantiles = np.quantile(seconds, [0.5, 0.9, 0.99])
+    return {
+        'total': float(seconds.sum()),
+        'mean': float(seconds.mean()),
+        'p50': float(quantiles[0]),
+        'p90': float(quantiles[1]),
+        'p99': float(quantiles[2]),
+        'max': float(seconds.max()),
+    }
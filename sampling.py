@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+# Quantiles reported by summarize.py, plus the mean
+STATISTICS = ['q1', 'median', 'q3', 'mean']
+QUANTILES = [0.25, 0.5, 0.75]
+
+
+def size_strata(ns):
+    ''' Stratum of each cluster: clusters whose sizes share a power of two are grouped together '''
+    return np.floor(np.log2(np.maximum(np.asarray(ns), 1))).astype(np.int64)
+
+
+def stratified_sample(ns, budget, rng, min_per_stratum=2):
+    ''' Sample clusters within size strata
+
+    parameters
+    ----------
+    ns: size of each candidate cluster
+    budget: number of clusters to sample, or fraction of them if below 1
+    rng: numpy Generator
+    min_per_stratum: clusters sampled from each stratum regardless of its share,
+        so every size range is represented and its variance can be estimated
+
+    returns
+    -------
+    strata: stratum of each cluster (see size_strata), -1 for strata that were sampled entirely
+    weights: number of clusters each sampled cluster stands for, 0 for the unsampled ones
+
+    The budget is split across strata proportionally to their size.
+    '''
+    ns = np.asarray(ns)
+    strata = size_strata(ns)
+    weights = np.zeros(len(ns))
+    if len(ns) == 0:
+        return strata, weights
+
+    total = int(round(budget * len(ns))) if budget < 1 else int(budget)
+    labels, counts = np.unique(strata, return_counts=True)
+    allocation = np.minimum(counts, np.maximum(np.round(total * counts / len(ns)).astype(np.int64), min_per_stratum))
+    for label, count, take in zip(labels, counts, allocation):
+        members = np.flatnonzero(strata == label)
+        chosen = rng.choice(members, size=take, replace=False)
+        weights[chosen] = count / take
+        if take == count:
+            strata[members] = -1
+    return strata, weights
+
+
+def weighted_quantiles(values, weights, quantiles):
+    ''' Quantiles of a weighted sample
+
+    Each value sits at the middle of its share of the total weight, and
+    quantiles are interpolated between those positions. With equal weights
+    this is pandas' linear interpolation instead, so exact values give the
+    same quantiles as summarize.py.
+    '''
+    order = np.argsort(values, kind='stable')
+    values = values[order]
+    weights = weights[order]
+    if len(values) == 1:
+        return np.full(len(quantiles), values[0], dtype=np.float64)
+    if (weights == weights[0]).all():
+        return np.quantile(values, quantiles)
+    cumulative = np.cumsum(weights)
+    positions = (cumulative - weights / 2) / cumulative[-1]
+    return np.interp(quantiles, positions, values)
+
+
+def _estimate(values, weights):
+    return np.append(weighted_quantiles(values, weights, QUANTILES), np.average(values, weights=weights))
+
+
+def sample_summary(values, weights, strata, reps=1000, rng=None, level=0.95):
+    ''' Estimated quartiles and mean of a per-cluster metric, with stratified bootstrap confidence intervals
+
+    parameters
+    ----------
+    values: the metric of every cluster, NaN where it was not computed
+    weights: number of clusters each value stands for (1 for exact values, 0 for unsampled clusters)
+    strata: stratum of each sampled cluster, -1 for clusters that were not sampled from
+    reps: number of bootstrap replicates
+    level: coverage of the confidence intervals
+
+    returns
+    -------
+    DataFrame indexed by STATISTICS with estimate, ci_low and ci_high columns
+
+    Each replicate resamples the sampled clusters with replacement within
+    their stratum and keeps the exact values as they are.
+    '''
+    if rng is None:
+        rng = np.random.default_rng()
+    values = np.asarray(values, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    strata = np.asarray(strata)
+
+    observed = (weights > 0) & ~np.isnan(values)
+    if not observed.any():
+        return pd.DataFrame(np.nan, index=STATISTICS, columns=['estimate', 'ci_low', 'ci_high'])
+    estimate = _estimate(values[observed], weights[observed])
+
+    exact = np.flatnonzero(observed & (strata < 0))
+    groups = [np.flatnonzero(observed & (strata == label)) for label in np.unique(strata[observed & (strata >= 0)])]
+    if not groups:
+        # Nothing was sampled, so the estimates are exact
+        return pd.DataFrame({'estimate': estimate, 'ci_low': estimate, 'ci_high': estimate}, index=STATISTICS)
+
+    replicates = np.empty((reps, len(STATISTICS)))
+    for r in range(reps):
+        picks = np.concatenate([exact] + [rng.choice(group, size=len(group)) for group in groups])
+        replicates[r] = _estimate(values[picks], weights[picks])
+
+    tail = (1 - level) / 2 * 100
+    low, high = np.percentile(replicates, [tail, 100 - tail], axis=0)
+    return pd.DataFrame({'estimate': estimate, 'ci_low': low, 'ci_high': high}, index=STATISTICS)
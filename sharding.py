@@ -0,0 +1,98 @@
+import glob
+import hashlib
+import heapq
+import json
+import os
+
+import numpy as np
+
+from edge_scan import scan_edges
+
+
+def parse_shard(shard):
+    ''' Parse an "i/N" shard specification into (i, N), with 0 <= i < N '''
+    try:
+        index, count = (int(part) for part in shard.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got {shard!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must satisfy 0 <= i < N, got {shard!r}")
+    return index, count
+
+
+def assign_shards(costs, count):
+    ''' Longest-processing-time assignment of items to count shards
+
+    Items are handed out from the most to the least expensive, each to
+    the shard with the lowest total so far. Ties are broken by position
+    and shard index, so every shard computes the same assignment.
+    '''
+    order = np.argsort(-np.asarray(costs, dtype=np.float64), kind='stable')
+    loads = [(0.0, shard) for shard in range(count)]
+    shards = np.empty(len(order), dtype=np.int64)
+    for i in order.tolist():
+        load, shard = heapq.heappop(loads)
+        shards[i] = shard
+        heapq.heappush(loads, (load + float(costs[i]), shard))
+    return shards
+
+
+def shard_positions(clusters, loaded, index, count):
+    ''' Positions of the clusters that shard index of count computes
+
+    Clusters are balanced by n + m, the size of the graph viecut works on.
+    '''
+    labels = clusters.labels(loaded.graph.upperNodeIdBound())
+    ms = scan_edges(labels, loaded.src, loaded.dst, len(clusters)).intra
+    shards = assign_shards(clusters.sizes() + ms, count)
+    return np.flatnonzero(shards == index)
+
+
+def clustering_digest(clusters):
+    ''' Digest of a clustering's cluster IDs and sizes, to check that shards were cut from the same clustering '''
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update('\n'.join(clusters.ids.tolist()).encode())
+    digest.update(np.ascontiguousarray(clusters.sizes(), dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def shard_path(outfile, index, count):
+    ''' The partial stats CSV of one shard, next to the final stats CSV '''
+    base, ext = os.path.splitext(outfile)
+    return f'{base}_shard{index}of{count}{ext}'
+
+
+def write_shard_meta(partial, meta):
+    ''' Write the sidecar that marks a shard's partial CSV as complete '''
+    with open(partial + '.json', 'w') as f:
+        json.dump(meta, f)
+
+
+def read_shard_metas(outfile):
+    ''' The sidecars of every finished shard of outfile, checked for a complete and consistent set '''
+    base, ext = os.path.splitext(outfile)
+    metas = []
+    for filepath in glob.glob(glob.escape(base) + '_shard*of*' + glob.escape(ext) + '.json'):
+        with open(filepath) as f:
+            metas.append(json.load(f))
+    if not metas:
+        raise ValueError(f"No finished shards found for {outfile}")
+
+    first = metas[0]
+    for key in ('shards', 'clusters', 'clustering', 'graph', 'n', 'm', 'columns'):
+        if any(meta[key] != first[key] for meta in metas):
+            raise ValueError(f"Shards of {outfile} disagree on {key}")
+
+    found = sorted(meta['shard'] for meta in metas)
+    missing = sorted(set(range(first['shards'])) - set(found))
+    if missing:
+        raise ValueError(f"Shards {missing} of {first['shards']} are missing or unfinished")
+
+    covered = np.bincount(
+        np.concatenate([np.asarray(meta['positions'], dtype=np.int64) for meta in metas]),
+        minlength=first['clusters']
+    )
+    if len(covered) != first['clusters'] or (covered != 1).any():
+        raise ValueError(f"Shards of {outfile} do not cover every cluster exactly once")
+
+    return sorted(metas, key=lambda meta: meta['shard'])
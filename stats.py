@@ -1,14 +1,31 @@
 import typer
-import networkit as nk
 import pandas as pd
 import os
 import json
+import shutil
+import tempfile
+import time
 
+import numpy as np
+
+from dataclasses import replace
 from numpy import log10, log2
 from typing import Dict, List
 
-from hm01.graph import Graph, IntangibleSubgraph, RealizedSubgraph
-from hm01.mincut import viecut
+from hm01.graph import Graph, RealizedSubgraph
+from before_json import iter_before
+from checkpoint import CheckpointedWriter, read_rows
+from connectivity import TIERS, VIECUT, certify_mincuts, iter_mincuts, mincut_bounds, timed_viecut
+from clustering_io import Clustering, load_clustering
+from edge_scan import scan_edges
+from graph_io import file_hash, load_graph
+from incremental import add_scans, check_previous, read_delta, still_exact
+from profiling import Profiler, peak_rss_mb
+from sampling import sample_summary, stratified_sample
+from sharding import clustering_digest, parse_shard, shard_path, shard_positions, write_shard_meta
+from stats_cache import StatsCache, cluster_keys
+from streaming import iter_cluster_buckets, local_edges, realize_local, stream_edges
+from truss import cluster_ktrusses
 
 
 class Statistics:
@@ -38,161 +55,653 @@ class Statistics:
         # TODO: Compute the summary stats and save it to a dataframe
         self.summary_stats = None
 
-def from_existing_clustering(filepath) -> List[IntangibleSubgraph]:
-    ''' I just modified the original method to return a dict mapping from index to clustering '''
-    # node_id cluster_id format
-    clusters: Dict[str, IntangibleSubgraph] = {}
-    with open(filepath) as f:
-        for line in f:
-            node_id, cluster_id = line.split()
-            clusters.setdefault(
-                cluster_id, IntangibleSubgraph([], cluster_id)
-            ).subset.append(int(node_id))
-    return {key: val for key, val in clusters.items() if val.n() > 1}
-
-def main(
-    input: str = typer.Option(..., "--input", "-i"),
-    existing_clustering: str = typer.Option(..., "--existing-clustering", "-e"),
-    resolution: float = typer.Option(-1, "--resolution", "-g"),
-    universal_before: str = typer.Option("", "--universal-before", "-ub"),
-    output: str = typer.Option("", "--output", "-o")
-): 
-    if output == "":
-        base, _ = os.path.splitext(existing_clustering)
-        outfile = base + '_stats.csv'
-    else:
-        outfile = output
+def from_existing_clustering(filepath) -> Clustering:
+    ''' Load a node_id cluster_id clustering, dropping singleton clusters '''
+    return load_clustering(filepath).without_singletons()
+
+def compute_stats(clusters, loaded, outfile, resolution=-1, workers=1, resume=False, memory_budget=None, fast_mincut=True, ktruss=True, stats_cache=None, profiler=None, mincut_profile=None, sample=0, sample_seed=0, scan=None, mincut_timeout=None) -> pd.DataFrame:
+    ''' Compute the per-cluster statistics table and write it to outfile
+
+    Rows are streamed to outfile as each cluster's mincut finishes and the
+    "Overall" row is appended at the end (see checkpoint.CheckpointedWriter).
+
+    parameters
+    ----------
+    clusters: Clustering (see clustering_io.load_clustering)
+    loaded: LoadedGraph (see graph_io.load_graph)
+    outfile: the stats CSV
+    resolution: CPM resolution, -1 to skip the cpm_score column
+    workers: number of processes to compute mincuts with
+    resume: skip the clusters an interrupted run already wrote to outfile
+    memory_budget: bytes that realized clusters may take up at the same time
+    fast_mincut: skip viecut for clusters whose mincut certify_mincuts settles
+    ktruss: add the max_ktruss column
+    stats_cache: StatsCache to reuse mincuts from and store new ones in
+    profiler: Profiler to record phase and per-cluster mincut timings in
+    mincut_profile: where to write a cProfile dump of the realizations and viecut calls
+    sample: only compute the mincut of a stratified sample of this many clusters (or this
+        fraction of them if below 1) among those that need viecut, and write estimated
+        summary statistics to outfile + '_sample_summary.csv'
+    sample_seed: seed for drawing the sample and for the bootstrap
+    scan: EdgeScan of the clusters if it is already known (see edge_scan.scan_clusterings)
+    mincut_timeout: seconds viecut may spend on one cluster, None for no limit; clusters
+        that run out of time get proven bounds (see connectivity.mincut_bounds) in the
+        connectivity_lb and connectivity_ub columns and an empty connectivity
+    '''
+    if profiler is None:
+        profiler = Profiler()
+    ids = clusters.ids.tolist()
+    ns = clusters.sizes().tolist()
+    global_graph = Graph(loaded.graph, "")
+
+    with profiler.phase('scan_edges'):
+        print("Scanning edges...")
+        # One pass over the edge list gives m, modularity, CPM and conductance for every cluster
+        labels = clusters.labels(global_graph.n())
+        if scan is None:
+            scan = scan_edges(labels, loaded.src, loaded.dst, len(clusters))
+        ms = scan.intra.tolist()
+        print("Done")
 
-    print("Loading clusters...")
-    clusters = from_existing_clustering(existing_clustering).values()
-    ids = [cluster.index for cluster in clusters]
-    ns = [cluster.n() for cluster in clusters]
-    print("Done")
+        print("Computing modularity...")
+        modularities = scan.modularity().tolist()
+        print("Done")
 
-    print("Loading graph...")
-    
-    # (VR) Load full graph into Graph object
-    edgelist_reader = nk.graphio.EdgeListReader("\t", 0)
-    nk_graph = edgelist_reader.read(input)
+        if resolution != -1:
+            print("Computing CPM score...")
+            cpms = scan.cpm(ns, resolution).tolist()
+            print("Done")
 
-    global_graph = Graph(nk_graph, "")
-    ms = [cluster.count_edges(global_graph) for cluster in clusters]
-    print("Done")
+        print("Computing conductance...")
+        conductances = scan.conductance().tolist()
+        print("Done")
 
-    print("Computing modularity...")
-    modularities = [global_graph.modularity_of(cluster) for cluster in clusters]
-    print("Done")
+    if ktruss:
+        with profiler.phase('ktruss'):
+            print("Computing k-truss...")
+            max_ktruss = cluster_ktrusses(clusters, labels, loaded.src, loaded.dst).max_k.tolist()
+            print("Done")
+
+    columns = stats_columns(resolution, ktruss, mincut_timeout is not None)
+    writer = CheckpointedWriter(outfile, columns, ids, resume)
+    todo = [i for i in range(len(clusters)) if i not in writer.done]
+    if len(writer.done) > 0:
+        print(f"Resuming with {len(writer.done)} of {len(clusters)} clusters already done")
+
+    def write_row(i, mincut, bounds=None):
+        n = ns[i]
+        cpm = [cpms[i]] if resolution != -1 else []
+        k = [max_ktruss[i]] if ktruss else []
+        bound = bound_values(mincut, bounds) if mincut_timeout is not None else []
+        writer.write(i, [ids[i], n, ms[i], modularities[i]] + cpm + connectivity_values(mincut, n) + [conductances[i]] + k + bound)
+
+    if fast_mincut:
+        with profiler.phase('certify_mincuts'):
+            print("Certifying mincuts...")
+            certified, tiers = certify_mincuts(clusters, labels, loaded.src, loaded.dst)
+            counts = np.bincount(tiers, minlength=len(TIERS))
+            print("Mincuts settled by " + ", ".join(f"{tier}: {count}" for tier, count in zip(TIERS, counts)))
+            for i in todo:
+                if tiers[i] != VIECUT:
+                    write_row(i, int(certified[i]))
+            todo = [i for i in todo if tiers[i] == VIECUT]
+            print("Done")
+
+    if stats_cache is not None:
+        with profiler.phase('stats_cache'):
+            print("Looking up cached mincuts...")
+            keys = cluster_keys(clusters, loaded.fingerprint, loaded.node_ids)
+            cached = stats_cache.get([keys[i] for i in todo])
+            hit = np.zeros(len(clusters), dtype=bool)
+            for i, mincut in zip(todo, cached):
+                if mincut >= 0:
+                    write_row(i, int(mincut))
+                    hit[i] = True
+            hits = int((cached >= 0).sum())
+            print(f"Stats cache hits: {hits} of {len(todo)} clusters ({100 * hits / max(len(todo), 1):.1f}%)")
+            todo = [i for i in todo if not hit[i]]
+            print("Done")
+
+    if sample > 0:
+        with profiler.phase('sample'):
+            print("Sampling clusters for mincut...")
+            # Certified and cached mincuts are exact and free, so only the clusters that need viecut are sampled
+            candidates = tiers == VIECUT if fast_mincut else np.ones(len(clusters), dtype=bool)
+            if stats_cache is not None:
+                candidates &= ~hit
+            weights = np.ones(len(clusters))
+            strata = np.full(len(clusters), -1, dtype=np.int64)
+            strata[candidates], weights[candidates] = stratified_sample(
+                clusters.sizes()[candidates], sample, np.random.default_rng(sample_seed)
+            )
+            for i in todo:
+                if weights[i] == 0:
+                    write_row(i, None)
+            todo = [i for i in todo if weights[i] > 0]
+            print(f"Computing mincut on {int((weights[candidates] > 0).sum())} of {int(candidates.sum())} clusters that need viecut")
+            print("Done")
+
+    with profiler.phase('mincut'):
+        if workers > 1:
+            print(f"Computing mincut on {workers} workers...")
+        else:
+            print("Computing mincut...")
+        timed_out = 0
+        for i, mincut, bounds, realize_s, cut_s in iter_mincuts(clusters, global_graph, todo, workers, scan.intra, memory_budget, mincut_profile, mincut_timeout):
+            profiler.mincut(ids[i], ns[i], ms[i], realize_s, cut_s)
+            if bounds is not None:
+                timed_out += 1
+            write_row(i, mincut, bounds)
+            if stats_cache is not None and mincut is not None:
+                stats_cache.put(keys[i], mincut)
+        if timed_out > 0:
+            print(f"viecut ran out of time on {timed_out} clusters, wrote bounds for them")
+        print("Done")
 
-    if resolution != -1:
-        print("Computing CPM score...")
-        cpms = [global_graph.cpm(cluster, resolution) for cluster in clusters]
+    with profiler.phase('output'):
+        print("Computing overall stats...")
+        df = writer.finish(overall_row(columns, global_graph.n(), global_graph.m(), modularities, cpms if resolution != -1 else None))
         print("Done")
 
-    print("Realizing clusters...")
-    clusters = [cluster.realize(global_graph) for cluster in clusters]
-    print("Done")
+    if sample > 0:
+        print("Estimating summary statistics...")
+        summary = estimate_summary(df.iloc[:-1], weights, strata, np.random.default_rng(sample_seed))
+        summary.to_csv(outfile + '_sample_summary.csv', index=False)
+        print(summary.to_string(index=False))
+        print("Done")
 
-    print("Computing mincut...")
-    mincut_results = [viecut(cluster) for cluster in clusters]
-    mincuts = [result[-1] for result in mincut_results]
-    mincuts_normalized = [mincut/log10(ns[i]) for i, mincut in enumerate(mincuts)]
-    mincuts_normalized_log2 = [mincut/log2(ns[i]) for i, mincut in enumerate(mincuts)]
-    mincuts_normalized_sqrt = [mincut/(ns[i]**0.5/5) for i, mincut in  enumerate(mincuts)]
+    return df
+
+def compute_stats_streaming(clusters, network, outfile, resolution=-1, resume=False, fast_mincut=True, ktruss=True, stats_cache=None, profiler=None, chunk_size=1 << 22, spill_dir=None, compact=False, mincut_timeout=None) -> pd.DataFrame:
+    ''' compute_stats without ever loading the global graph
+
+    The edge list is read chunk_size edges at a time and deduplicated
+    through a spill under spill_dir (see streaming.stream_edges), which
+    gives the per-cluster edge counters and a spill of the intra-cluster
+    edges. That spill is read back one bucket of clusters at a time for
+    k-truss and the mincut certificates, and the clusters that still need
+    viecut are realized one at a time from their own edges. The output is
+    the same as that of compute_stats.
+
+    parameters
+    ----------
+    clusters: Clustering (see clustering_io.load_clustering)
+    network: path of the edge list, plain or compressed
+    compact: report the number of distinct node IDs in the "Overall" row, as
+        compute_stats does on a graph loaded with compacted IDs
+    see compute_stats for the others
+    '''
+    if profiler is None:
+        profiler = Profiler()
+    ids = clusters.ids.tolist()
+    ns = clusters.sizes().tolist()
+
+    directory = tempfile.mkdtemp(prefix='stats_spill_', dir=spill_dir)
+    try:
+        with profiler.phase('scan_edges'):
+            print("Streaming edges...")
+            streamed = stream_edges(network, clusters, directory, chunk_size, compact)
+            scan = streamed.scan
+            print(f"Spilled {int(scan.intra.sum())} intra-cluster edges ({streamed.intra.bytes() / 2**20:.1f} MB)")
+            modularities = scan.modularity().tolist()
+            cpms = scan.cpm(ns, resolution).tolist() if resolution != -1 else None
+            conductances = scan.conductance().tolist()
+            print("Done")
+
+        if stats_cache is not None:
+            keys = cluster_keys(clusters, file_hash(network))
+
+        columns = stats_columns(resolution, ktruss, mincut_timeout is not None)
+        writer = CheckpointedWriter(outfile, columns, ids, resume)
+        if len(writer.done) > 0:
+            print(f"Resuming with {len(writer.done)} of {len(clusters)} clusters already done")
+
+        hits = 0
+        lookups = 0
+        timed_out = 0
+        with profiler.phase('mincut'):
+            print("Computing k-truss and mincut from the spilled edges...")
+            for positions, local, src, dst in iter_cluster_buckets(streamed.intra, clusters):
+                labels = local.labels(0)
+                if ktruss:
+                    max_ktruss = cluster_ktrusses(local, labels, src, dst).max_k.tolist()
+                if fast_mincut:
+                    certified, tiers = certify_mincuts(local, labels, src, dst)
+                todo = [j for j, i in enumerate(positions.tolist()) if i not in writer.done]
+                if stats_cache is not None:
+                    viecut_todo = [j for j in todo if not fast_mincut or tiers[j] == VIECUT]
+                    cached = dict(zip(viecut_todo, stats_cache.get([keys[positions[j]] for j in viecut_todo]).tolist()))
+                    lookups += len(viecut_todo)
+
+                for j in todo:
+                    i = int(positions[j])
+                    bounds = None
+                    if fast_mincut and tiers[j] != VIECUT:
+                        mincut = int(certified[j])
+                    elif stats_cache is not None and cached[j] >= 0:
+                        mincut = int(cached[j])
+                        hits += 1
+                    else:
+                        cluster, realize_s = realize_local(local, src, dst, j)
+                        start = time.perf_counter()
+                        mincut = timed_viecut(cluster, mincut_timeout)
+                        profiler.mincut(ids[i], ns[i], int(scan.intra[i]), realize_s, time.perf_counter() - start)
+                        del cluster
+                        if mincut is None:
+                            timed_out += 1
+                            bounds = mincut_bounds(*local_edges(local, src, dst, j), mincut_timeout)
+                            mincut = bounds[0] if bounds[0] == bounds[1] else None
+                        if stats_cache is not None and mincut is not None:
+                            stats_cache.put(keys[i], mincut)
+
+                    cpm = [cpms[i]] if resolution != -1 else []
+                    k = [max_ktruss[j]] if ktruss else []
+                    bound = bound_values(mincut, bounds) if mincut_timeout is not None else []
+                    writer.write(i, [ids[i], ns[i], int(scan.intra[i]), modularities[i]] + cpm + connectivity_values(mincut, ns[i]) + [conductances[i]] + k + bound)
+            if timed_out > 0:
+                print(f"viecut ran out of time on {timed_out} clusters, wrote bounds for them")
+            if stats_cache is not None:
+                print(f"Stats cache hits: {hits} of {lookups} clusters ({100 * hits / max(lookups, 1):.1f}%)")
+            print("Done")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    with profiler.phase('output'):
+        print("Computing overall stats...")
+        df = writer.finish(overall_row(columns, streamed.n, streamed.m, modularities, cpms))
+        print("Done")
 
-    print("Done")
+    return df
+
+def update_stats(clusters, loaded, previous, delta, outfile, resolution=-1, workers=1, memory_budget=None, fast_mincut=True, ktruss=True, profiler=None, mincut_profile=None) -> pd.DataFrame:
+    ''' Update a previous stats table for edges added to its network
+
+    parameters
+    ----------
+    clusters: Clustering the previous table was computed for
+    loaded: LoadedGraph of the network the previous table was computed on,
+        whose graph gets the new edges
+    previous: the previous stats table (see checkpoint.read_rows)
+    delta: edge list of the added edges, in any format load_graph reads;
+        edges the network already has are ignored
+    see compute_stats for the others
+
+    The edge counters of the updated network are those of the previous
+    one plus those of the new edges. Every cluster's modularity and
+    conductance depend on the total edge count, so all of them are
+    recomputed from the counters, which is cheap. Only the clusters that
+    gained internal edges get a new k-truss, and a new mincut unless a
+    certificate or their previous mincut settles it (see
+    incremental.still_exact). The output is the same as that of
+    compute_stats on the updated network.
+    '''
+    if profiler is None:
+        profiler = Profiler()
+    ids = clusters.ids.tolist()
+    ns = clusters.sizes().tolist()
+    columns = stats_columns(resolution, ktruss)
+    check_previous(previous, clusters, loaded.graph.numberOfNodes(), loaded.graph.numberOfEdges(), columns)
+
+    with profiler.phase('scan_edges'):
+        print("Reading new edges...")
+        src, dst, known = read_delta(delta, loaded)
+        print(f"{len(src)} new edges, {known} already in the network")
+        n = max(loaded.graph.numberOfNodes(), int(dst.max()) + 1 if len(dst) > 0 else 0)
+        labels = clusters.labels(n)
+        gained = scan_edges(labels, src, dst, len(clusters))
+        scan = add_scans(scan_edges(labels, loaded.src, loaded.dst, len(clusters)), gained)
+        ms = scan.intra.tolist()
+        modularities = scan.modularity().tolist()
+        cpms = scan.cpm(ns, resolution).tolist() if resolution != -1 else None
+        conductances = scan.conductance().tolist()
+        print("Done")
 
-    print("Computing conductance...")
-    conductances = []
-    for i, cluster in enumerate(clusters):
-        conductances.append(cluster.conductance(global_graph))
-    print("Done")
+    with profiler.phase('update_graph'):
+        print("Adding new edges to the graph...")
+        graph = loaded.graph
+        if n > graph.numberOfNodes():
+            graph.addNodes(n - graph.numberOfNodes())
+        for u, v in zip(src.tolist(), dst.tolist()):
+            graph.addEdge(u, v)
+        global_graph = Graph(graph, "")
+        print("Done")
 
-    print("Computing overall stats...")
-    m = global_graph.m()
-    ids.append("Overall")
-    modularities.append(sum(modularities))
+    rows = previous.iloc[:-1]
+    mincuts = rows['connectivity'].to_numpy().astype(np.int64)
+    if ktruss:
+        max_ktruss = rows['max_ktruss'].to_numpy().astype(np.int64)
+
+    # Self-loops change volumes but neither k-truss nor mincut
+    loops = src == dst
+    touched = scan_edges(labels, src[~loops], dst[~loops], len(clusters)).intra > 0
+    positions = np.flatnonzero(touched)
+    todo = []
+    print(f"{len(positions)} of {len(clusters)} clusters gained internal edges")
+    if len(positions) > 0:
+        with profiler.phase('ktruss'):
+            selected = clusters.select(touched)
+            selected_labels = selected.labels(n)
+
+            def internal(u, v):
+                return (selected_labels[u] >= 0) & (selected_labels[u] == selected_labels[v])
+
+            old = internal(loaded.src, loaded.dst)
+            new = internal(src, dst)
+            selected_src = np.concatenate([loaded.src[old], src[new]])
+            selected_dst = np.concatenate([loaded.dst[old], dst[new]])
+            if ktruss:
+                print("Computing k-truss...")
+                max_ktruss[positions] = cluster_ktrusses(selected, selected_labels, selected_src, selected_dst).max_k
+                print("Done")
+
+        with profiler.phase('certify_mincuts'):
+            print("Certifying mincuts...")
+            settled = np.full(len(positions), -1, dtype=np.int64)
+            if fast_mincut:
+                certified, tiers = certify_mincuts(selected, selected_labels, selected_src, selected_dst)
+                settled[tiers != VIECUT] = certified[tiers != VIECUT]
+            kept = (settled < 0) & still_exact(selected, selected_labels, selected_src, selected_dst, mincuts[positions])
+            settled[kept] = mincuts[positions][kept]
+            mincuts[positions] = settled
+            todo = positions[settled < 0].tolist()
+            print(f"Kept {int(kept.sum())} previous mincuts, computing {len(todo)}")
+            print("Done")
+
+    writer = CheckpointedWriter(outfile, columns, ids)
+
+    def write_row(i, mincut):
+        cpm = [cpms[i]] if resolution != -1 else []
+        k = [int(max_ktruss[i])] if ktruss else []
+        writer.write(i, [ids[i], ns[i], ms[i], modularities[i]] + cpm + connectivity_values(mincut, ns[i]) + [conductances[i]] + k)
+
+    for i in range(len(clusters)):
+        if mincuts[i] >= 0:
+            write_row(i, int(mincuts[i]))
+
+    with profiler.phase('mincut'):
+        print("Computing mincut...")
+        for i, mincut, _, realize_s, cut_s in iter_mincuts(clusters, global_graph, todo, workers, scan.intra, memory_budget, mincut_profile):
+            write_row(i, mincut)
+            profiler.mincut(ids[i], ns[i], ms[i], realize_s, cut_s)
+        print("Done")
 
-    if resolution != -1:
-        cpms.append(sum(cpms))
-
-    ns.append(global_graph.n())
-    ms.append(m)
-    mincuts.append(None)
-    mincuts_normalized.append(None)
-    mincuts_normalized_log2.append(None)
-    mincuts_normalized_sqrt.append(None)
-    conductances.append(None)
-    # ktruss_nodes.append(None)
-    print("Done")
+    with profiler.phase('output'):
+        print("Computing overall stats...")
+        df = writer.finish(overall_row(columns, global_graph.n(), global_graph.m(), modularities, cpms))
+        print("Done")
 
-    print("Writing to output file...")
+    return df
 
+def stats_columns(resolution, ktruss, bounds=False):
+    ''' Columns of the stats CSV, with the connectivity bound columns when mincuts have a time limit '''
     if resolution != -1:
-        df = pd.DataFrame(list(zip(ids, ns, ms, modularities, cpms, mincuts, mincuts_normalized, mincuts_normalized_log2, mincuts_normalized_sqrt, conductances)),
-            columns =['cluster', 'n', 'm', 'modularity', 'cpm_score', 'connectivity', 'connectivity_normalized_log10(n)', 'connectivity_normalized_log2(n)', 'connectivity_normalized_sqrt(n)/5', 'conductance'])
+        columns = ['cluster', 'n', 'm', 'modularity', 'cpm_score', 'connectivity', 'connectivity_normalized_log10(n)', 'connectivity_normalized_log2(n)', 'connectivity_normalized_sqrt(n)/5', 'conductance']
     else:
-        df = pd.DataFrame(list(zip(ids, ns, ms, modularities, mincuts, mincuts_normalized, mincuts_normalized_log2, mincuts_normalized_sqrt, conductances)),
-            columns =['cluster', 'n', 'm', 'modularity', 'connectivity', 'connectivity_normalized_log10(n)', 'connectivity_normalized_log2(n)', 'connectivity_normalized_sqrt(n)/5', 'conductance'])
-
-    df.to_csv(outfile, index=False)
+        columns = ['cluster', 'n', 'm', 'modularity', 'connectivity', 'connectivity_normalized_log10(n)', 'connectivity_normalized_log2(n)', 'connectivity_normalized_sqrt(n)/5', 'conductance']
+    if ktruss:
+        columns.append('max_ktruss')
+    if bounds:
+        columns.extend(['connectivity_lb', 'connectivity_ub', 'connectivity_exact'])
+    return columns
+
+def connectivity_values(mincut, n):
+    ''' The connectivity columns of a cluster with n nodes, empty when its mincut was not computed '''
+    if mincut is None:
+        return [None] * 4
+    return [mincut, mincut/log10(n), mincut/log2(n), mincut/(n**0.5/5)]
+
+def bound_values(mincut, bounds=None):
+    ''' The connectivity_lb, connectivity_ub and connectivity_exact columns, from bounds if the mincut is not known '''
+    if mincut is not None:
+        return [mincut, mincut, True]
+    return [bounds[0], bounds[1], False]
+
+def estimate_summary(stats, weights, strata, rng):
+    ''' Summary statistics of a sampled stats table, with bootstrap confidence intervals
+
+    Connectivity is estimated from the sampled clusters, each standing for
+    weights[i] clusters of its size stratum. The other columns were
+    computed for every cluster, so their statistics are exact.
+    '''
+    summaries = []
+    for column in ['n', 'modularity', 'conductance', 'connectivity', 'connectivity_normalized_log10(n)']:
+        sampled = column.startswith('connectivity')
+        summary = sample_summary(
+            stats[column].to_numpy(dtype=np.float64),
+            weights if sampled else np.ones(len(stats)),
+            strata if sampled else np.full(len(stats), -1),
+            rng=rng
+        )
+        summary.insert(0, 'statistic', summary.index)
+        summary.insert(0, 'metric', column)
+        summary['exact'] = not sampled or not (weights > 1).any()
+        summaries.append(summary)
+    return pd.concat(summaries, ignore_index=True)
+
+def overall_row(columns, n, m, modularities, cpms=None):
+    ''' The "Overall" row: graph size, total modularity and total CPM score if there is a cpm_score column '''
+    cpm = [sum(cpms)] if cpms is not None else []
+    return ["Overall", n, m, sum(modularities)] + cpm + [None] * (len(columns) - 4 - len(cpm))
+
+def write_universal_outputs(universal_before, outfile, ids, ns):
+    ''' Write the _to_universal.json/.csv outputs relating CM2Universal's before.json to this clustering '''
+    print("Writing extra outputs from CM2Universal")
+
+    cluster_sizes = {key.replace('"', ''): val for key, val in zip(ids, ns)}
+    
+    output_entries = []
+    # Only the size of each input cluster is needed, so node lists are counted without loading them
+    for cluster in iter_before(universal_before):
+        if not cluster.extant:
+            output_entries.append({
+                "input_cluster": cluster.label,
+                'n': cluster.n,
+                'extant': False,
+                'descendants': {
+                    desc: cluster_sizes[desc]
+                    for desc in cluster.descendants
+                    if desc in cluster_sizes
+                }
+            })
+        else:
+            output_entries.append({
+                "input_cluster": cluster.label,
+                'n': cluster.n,
+                'extant': True
+            })
+
+    # Specify the file path for the JSON output
+    json_file_path = outfile + '_to_universal.json'
+    csv_file_path = outfile + '_to_universal.csv'
+
+    # Get lines for the csv format
+    csv_lines = ['input_cluster,n,descendant,desc_n,extant']
+    for entry in output_entries:
+        if entry['extant']:
+            csv_lines.append(f'{entry["input_cluster"]},{entry["n"]},,,1')
+        elif len(entry['descendants']) == 0:
+            csv_lines.append(f'{entry["input_cluster"]},{entry["n"]},,,0')
+        else:
+            for descendant, desc_n in entry['descendants'].items():
+                csv_lines.append(f'{entry["input_cluster"]},{entry["n"]},{descendant},{desc_n},0')
+
+    print("\tWriting JSON")
+    # Write the array of dictionaries as formatted JSON to the file
+    with open(json_file_path, 'w') as json_file:
+        json.dump(output_entries, json_file, indent=4)
+    print("\tDone")
+
+    print("\tWriting CSV")
+    # Write the lines to the file
+    with open(csv_file_path, 'w') as file:
+        for line in csv_lines:
+            file.write(line + '\n')
+    print("\tDone")
     print("Done")
 
-    if len(universal_before) > 0:
-        print("Writing extra outputs from CM2Universal")
-
-        cluster_sizes = {key.replace('"', ''): val for key, val in zip(ids, ns)}
-        
-        output_entries = []
-        with open(universal_before) as json_file:
-            before = json.load(json_file) 
-            for cluster in before:
-                if not cluster['extant']:
-                    output_entries.append({
-                        "input_cluster": cluster['label'],
-                        'n': len(cluster['nodes']),
-                        'extant': False,
-                        'descendants': {
-                            desc: cluster_sizes[desc]
-                            for desc in cluster['descendants']
-                            if desc in cluster_sizes
-                        }
-                    })
-                else:
-                    output_entries.append({
-                        "input_cluster": cluster['label'],
-                        'n': len(cluster['nodes']),
-                        'extant': True
-                    })
-
-        # Specify the file path for the JSON output
-        json_file_path = outfile + '_to_universal.json'
-        csv_file_path = outfile + '_to_universal.csv'
-
-        # Get lines for the csv format
-        csv_lines = ['input_cluster,n,descendant,desc_n,extant']
-        for entry in output_entries:
-            if entry['extant']:
-                csv_lines.append(f'{entry["input_cluster"]},{entry["n"]},,,1')
-            elif len(entry['descendants']) == 0:
-                csv_lines.append(f'{entry["input_cluster"]},{entry["n"]},,,0')
-            else:
-                for descendant, desc_n in entry['descendants'].items():
-                    csv_lines.append(f'{entry["input_cluster"]},{entry["n"]},{descendant},{desc_n},0')
-
-        print("\tWriting JSON")
-        # Write the array of dictionaries as formatted JSON to the file
-        with open(json_file_path, 'w') as json_file:
-            json.dump(output_entries, json_file, indent=4)
-        print("\tDone")
-
-        print("\tWriting CSV")
-        # Write the lines to the file
-        with open(csv_file_path, 'w') as file:
-            for line in csv_lines:
-                file.write(line + '\n')
-        print("\tDone")
+def output_path(existing_clustering, output=""):
+    ''' The stats CSV path: output if given, otherwise next to the clustering '''
+    if output == "":
+        base, _ = os.path.splitext(existing_clustering)
+        return base + '_stats.csv'
+    return output
+
+def main(
+    input: str = typer.Option(..., "--input", "-i"),
+    existing_clustering: str = typer.Option(..., "--existing-clustering", "-e"),
+    resolution: float = typer.Option(-1, "--resolution", "-g"),
+    universal_before: str = typer.Option("", "--universal-before", "-ub"),
+    output: str = typer.Option("", "--output", "-o"),
+    workers: int = typer.Option(1, "--workers"),
+    cache: bool = typer.Option(True, "--cache/--no-cache"),
+    compact_ids: bool = typer.Option(False, "--compact-ids",
+        help='Number nodes densely instead of by ID, for edge lists with sparse or huge node IDs'),
+    resume: bool = typer.Option(False, "--resume"),
+    memory_budget: float = typer.Option(0, "--memory-budget",
+        help='MB that realized clusters may take up at the same time, 0 for no limit'),
+    fast_mincut: bool = typer.Option(True, "--fast-mincut/--no-fast-mincut"),
+    noktruss: bool = typer.Option(False, "--noktruss", "-n"),
+    stats_cache_path: str = typer.Option("", "--stats-cache",
+        help='SQLite file to reuse per-cluster mincuts from across runs'),
+    stats_cache_size: float = typer.Option(1024, "--stats-cache-size",
+        help='MB the stats cache may take up before old entries are evicted'),
+    profile: bool = typer.Option(False, "--profile",
+        help='Write per-phase timings, memory and mincut timings to {output}_profile.json'),
+    cprofile: bool = typer.Option(False, "--cprofile",
+        help='Write a cProfile dump of the mincut phase to {output}_mincut.prof'),
+    shard: str = typer.Option("", "--shard",
+        help='Only compute shard i of N, given as i/N with 0 <= i < N; combine the shards with merge_shards.py'),
+    sample: float = typer.Option(0, "--sample",
+        help='Compute mincuts on a size-stratified sample of this many clusters (a fraction if below 1), 0 for all'),
+    sample_seed: int = typer.Option(0, "--sample-seed"),
+    streaming: bool = typer.Option(False, "--streaming",
+        help='Never load the whole graph: stream the edge list in chunks and spill intra-cluster edges to disk'),
+    chunk_size: int = typer.Option(1 << 22, "--chunk-size", help='Edges read at a time with --streaming'),
+    spill_dir: str = typer.Option("", "--spill-dir",
+        help='Where --streaming spills intra-cluster edges, defaults to the system temporary directory'),
+    mincut_timeout: float = typer.Option(0, "--mincut-timeout",
+        help='Seconds viecut may spend on one cluster before it gets mincut bounds instead, 0 for no limit'),
+    previous: str = typer.Option("", "--previous",
+        help='Stats CSV computed for this clustering on the network given by -i, to update with --delta'),
+    delta: str = typer.Option("", "--delta",
+        help='Edge list of edges added to the network since --previous; only the clusters they touch are recomputed')
+): 
+    outfile = output_path(existing_clustering, output)
+    profiler = Profiler()
+    timeout = mincut_timeout if mincut_timeout > 0 else None
+
+    if timeout is not None and sample:
+        raise typer.BadParameter("cannot be combined with --mincut-timeout", param_hint="--sample")
+    if bool(previous) != bool(delta):
+        raise typer.BadParameter("--previous and --delta go together", param_hint="--delta" if previous else "--previous")
+    if delta:
+        for option, value in (('--streaming', streaming), ('--shard', shard), ('--sample', sample), ('--compact-ids', compact_ids),
+                              ('--resume', resume), ('--mincut-timeout', timeout), ('--stats-cache', stats_cache_path)):
+            if value:
+                raise typer.BadParameter("cannot be combined with --delta", param_hint=option)
+    if streaming:
+        for option, value in (('--shard', shard), ('--sample', sample)):
+            if value:
+                raise typer.BadParameter("cannot be combined with --streaming", param_hint=option)
+
+    with profiler.phase('load_clustering'):
+        print("Loading clusters...")
+        clusters = from_existing_clustering(existing_clustering)
         print("Done")
 
+    if streaming:
+        if workers > 1:
+            print("--streaming computes mincuts one cluster at a time, ignoring --workers")
+        stats_cache = StatsCache(stats_cache_path, stats_cache_size * 2**20) if stats_cache_path else None
+        try:
+            df = compute_stats_streaming(clusters, input, outfile, resolution, resume, fast_mincut, not noktruss, stats_cache, profiler, chunk_size, spill_dir or None, compact_ids, timeout)
+        finally:
+            if stats_cache is not None:
+                evicted = stats_cache.close()
+                if evicted > 0:
+                    print(f"Evicted {evicted} entries from the stats cache")
+        if len(universal_before) > 0:
+            with profiler.phase('universal_outputs'):
+                write_universal_outputs(universal_before, outfile, df['cluster'].tolist(), df['n'].tolist())
+        own, _ = peak_rss_mb()
+        print(f"Peak RSS: {own:.1f} MB")
+        if profile:
+            profiler.write(outfile + '_profile.json')
+            print(f"Wrote profile to {outfile}_profile.json")
+        return
+
+    with profiler.phase('load_graph'):
+        print("Loading graph...")
+
+        # (VR) Load full graph into Graph object
+        loaded = load_graph(input, cache, compact_ids, workers)
+        if compact_ids:
+            clusters = replace(clusters, nodes=loaded.compact_ids(clusters.nodes))
+        print("Done")
+
+    if shard:
+        try:
+            index, count = parse_shard(shard)
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint="--shard")
+        total = len(clusters)
+        positions = shard_positions(clusters, loaded, index, count)
+        mask = np.zeros(total, dtype=bool)
+        mask[positions] = True
+        digest = clustering_digest(clusters)
+        clusters = clusters.select(mask)
+        outfile = shard_path(outfile, index, count)
+        print(f"Shard {index}/{count}: {len(clusters)} of {total} clusters")
+
+    budget = memory_budget * 2**20 if memory_budget > 0 else None
+    mincut_profile = outfile + '_mincut.prof' if cprofile else None
+    stats_cache = StatsCache(stats_cache_path, stats_cache_size * 2**20) if stats_cache_path else None
+    try:
+        if delta:
+            # --previous is often the default output itself, so the update goes to a file of its own
+            # and only replaces the output once it is complete, which --resume cannot do for updates
+            update_file = outfile + '.update'
+            try:
+                df = update_stats(clusters, loaded, read_rows(previous), delta, update_file, resolution, workers, budget, fast_mincut, not noktruss, profiler, mincut_profile)
+            except ValueError as e:
+                print(e)
+                raise typer.Exit(1)
+            os.replace(update_file, outfile)
+        else:
+            df = compute_stats(clusters, loaded, outfile, resolution, workers, resume, budget, fast_mincut, not noktruss, stats_cache, profiler, mincut_profile, sample, sample_seed, mincut_timeout=timeout)
+    finally:
+        if stats_cache is not None:
+            evicted = stats_cache.close()
+            if evicted > 0:
+                print(f"Evicted {evicted} entries from the stats cache")
+
+    if shard:
+        write_shard_meta(outfile, {
+            'shard': index,
+            'shards': count,
+            'clusters': total,
+            'clustering': digest,
+            'graph': loaded.fingerprint,
+            'n': loaded.graph.numberOfNodes(),
+            'm': loaded.graph.numberOfEdges(),
+            'columns': df.columns.tolist(),
+            'positions': positions.tolist(),
+        })
+        if len(universal_before) > 0:
+            print("Skipping -ub outputs for a shard, pass -ub to merge_shards.py instead")
+    elif len(universal_before) > 0:
+        with profiler.phase('universal_outputs'):
+            write_universal_outputs(universal_before, outfile, df['cluster'].tolist(), df['n'].tolist())
+
+    own, children = peak_rss_mb()
+    print(f"Peak RSS: {own:.1f} MB (largest worker: {children:.1f} MB)")
+
+    if profile:
+        profiler.write(outfile + '_profile.json')
+        print(f"Wrote profile to {outfile}_profile.json")
+    if mincut_profile is not None and os.path.exists(mincut_profile):
+        print(f"Wrote cProfile dump of the mincut phase to {mincut_profile}")
+
 def entry_point():
     typer.run(main)
 
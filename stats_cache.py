@@ -0,0 +1,110 @@
+import hashlib
+import sqlite3
+import time
+
+import numpy as np
+
+
+class StatsCache:
+    ''' Persistent per-cluster mincut cache shared across clusterings of a network
+
+    A cluster's mincut only depends on the graph and on the cluster's node
+    set, so it is keyed by the graph's fingerprint (see graph_io.LoadedGraph)
+    and the sorted member nodes (see cluster_keys). Entries live in a
+    SQLite file that several stats.py runs can share. Once the file
+    holds more than max_bytes, the least recently used entries are evicted.
+
+    parameters
+    ----------
+    path: the SQLite file, created if missing
+    max_bytes: size the live entries may take up on disk
+    '''
+    def __init__(self, path, max_bytes=1 << 30):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.lookups = 0
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS mincuts (key BLOB PRIMARY KEY, mincut INTEGER, last_used INTEGER) WITHOUT ROWID'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS mincuts_last_used ON mincuts (last_used)')
+        self.connection.commit()
+
+    def get(self, keys):
+        ''' Cached mincuts of the given keys, -1 where there is none '''
+        mincuts = np.full(len(keys), -1, dtype=np.int64)
+        found = {}
+        # Stay under SQLite's limit on the number of bound parameters
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            found.update(self.connection.execute(
+                f'SELECT key, mincut FROM mincuts WHERE key IN ({",".join("?" * len(chunk))})', chunk
+            ))
+        for i, key in enumerate(keys):
+            mincuts[i] = found.get(key, -1)
+
+        now = time.time_ns()
+        self.connection.executemany('UPDATE mincuts SET last_used = ? WHERE key = ?', ((now, key) for key in found))
+        self.connection.commit()
+        self.hits += len(found)
+        self.lookups += len(keys)
+        return mincuts
+
+    def put(self, key, mincut):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO mincuts VALUES (?, ?, ?)', (key, int(mincut), time.time_ns())
+        )
+        self.connection.commit()
+
+    def used_bytes(self):
+        page_size, = self.connection.execute('PRAGMA page_size').fetchone()
+        page_count, = self.connection.execute('PRAGMA page_count').fetchone()
+        free_pages, = self.connection.execute('PRAGMA freelist_count').fetchone()
+        return (page_count - free_pages) * page_size
+
+    def evict(self):
+        ''' Drop least recently used entries until the live entries fit in max_bytes '''
+        evicted = 0
+        used = self.used_bytes()
+        while used > self.max_bytes:
+            entries, = self.connection.execute('SELECT COUNT(*) FROM mincuts').fetchone()
+            if entries == 0:
+                break
+            # Entries are of similar size, so drop the overflowing fraction plus some slack
+            drop = max(1, int(entries * (1 - self.max_bytes / used)) + entries // 20)
+            self.connection.execute(
+                'DELETE FROM mincuts WHERE key IN (SELECT key FROM mincuts ORDER BY last_used LIMIT ?)', (drop,)
+            )
+            self.connection.commit()
+            evicted += drop
+            used = self.used_bytes()
+        return evicted
+
+    def close(self):
+        evicted = self.evict()
+        self.connection.close()
+        return evicted
+
+
+def cluster_keys(clusters, fingerprint, node_ids=None):
+    ''' Cache key of every cluster: a digest of the graph fingerprint and the sorted member nodes
+
+    parameters
+    ----------
+    clusters: Clustering (see clustering_io.load_clustering)
+    fingerprint: LoadedGraph.fingerprint of the graph the clusters live in
+    node_ids: LoadedGraph.node_ids, so clusters of a graph with compacted node
+        IDs are keyed by their original IDs like those of the uncompacted graph
+    '''
+    members = clusters.nodes if node_ids is None else node_ids[clusters.nodes]
+    positions = np.repeat(np.arange(len(clusters)), clusters.sizes())
+    nodes = np.ascontiguousarray(members[np.lexsort((members, positions))], dtype=np.int64)
+    graph_digest = hashlib.blake2b(fingerprint.encode(), digest_size=20)
+
+    keys = []
+    for i in range(len(clusters)):
+        digest = graph_digest.copy()
+        digest.update(nodes[clusters.offsets[i]:clusters.offsets[i + 1]].tobytes())
+        keys.append(digest.digest())
+    return keys
@@ -0,0 +1,81 @@
+import http.client
+import json
+import os
+import socket as sock
+import sys
+import time
+
+import typer
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    ''' HTTPConnection over a Unix socket '''
+    def __init__(self, path):
+        super().__init__('localhost')
+        self.path = path
+
+    def connect(self):
+        self.sock = sock.socket(sock.AF_UNIX, sock.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+def request(server, method, path, payload=None):
+    ''' Send a JSON request to a stats_server.py and return the decoded reply '''
+    if server.startswith('http://'):
+        connection = http.client.HTTPConnection(server[len('http://'):])
+    else:
+        connection = UnixHTTPConnection(server)
+
+    body = json.dumps(payload) if payload is not None else None
+    connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    reply = json.loads(response.read())
+    connection.close()
+    if response.status >= 400:
+        raise RuntimeError(reply.get('error', response.reason))
+    return reply
+
+
+def main(
+    input: str = typer.Option(..., "--input", "-i"),
+    existing_clustering: str = typer.Option(..., "--existing-clustering", "-e"),
+    resolution: float = typer.Option(-1, "--resolution", "-g"),
+    universal_before: str = typer.Option("", "--universal-before", "-ub"),
+    output: str = typer.Option("", "--output", "-o"),
+    server: str = typer.Option("http://127.0.0.1:8765", "--server",
+        help='stats_server.py address: http://host:port or the path of its Unix socket'),
+    poll: float = typer.Option(1.0, "--poll", help='Seconds between progress checks')
+):
+    if output == "":
+        base, _ = os.path.splitext(existing_clustering)
+        output = base + '_stats.csv'
+
+    # The server has its own working directory, so only send absolute paths
+    job = request(server, 'POST', '/jobs', {
+        'input': os.path.abspath(input),
+        'existing_clustering': os.path.abspath(existing_clustering),
+        'output': os.path.abspath(output),
+        'resolution': resolution,
+        'universal_before': os.path.abspath(universal_before) if universal_before else "",
+    })
+
+    printed = 0
+    while True:
+        job = request(server, 'GET', f"/jobs/{job['id']}")
+        for line in job['progress'][printed:]:
+            print(line)
+        printed = len(job['progress'])
+
+        if job['status'] == 'done':
+            break
+        if job['status'] == 'failed':
+            print(job['error'], file=sys.stderr)
+            raise typer.Exit(1)
+        time.sleep(poll)
+
+
+def entry_point():
+    typer.run(main)
+
+if __name__ == "__main__":
+    entry_point()
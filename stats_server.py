@@ -0,0 +1,239 @@
+import io
+import json
+import os
+import queue
+import socketserver
+import sys
+import threading
+import traceback
+import uuid
+
+import typer
+
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+from graph_io import load_graph
+from stats import compute_stats, from_existing_clustering, write_universal_outputs
+
+
+@dataclass
+class Job:
+    ''' A stats.py run queued on the server
+
+    status is one of queued, running, done or failed. progress holds the
+    lines stats.py would have printed so far.
+    '''
+    input: str
+    existing_clustering: str
+    output: str
+    resolution: float = -1
+    universal_before: str = ""
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: str = "queued"
+    progress: List[str] = field(default_factory=list)
+    error: str = ""
+
+
+class ProgressWriter(io.TextIOBase):
+    ''' Collect printed lines into a job's progress list '''
+    def __init__(self, job):
+        self.job = job
+        self.buffer = ""
+
+    def write(self, text):
+        self.buffer += text
+        *lines, self.buffer = self.buffer.split('\n')
+        self.job.progress.extend(lines)
+        return len(text)
+
+
+class ThreadStdout(io.TextIOBase):
+    ''' sys.stdout that sends what a thread prints to that thread's writer, if it set one
+
+    Jobs run on their own thread while HTTP threads keep printing, so
+    swapping sys.stdout for a job would catch their output too.
+    '''
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    @contextmanager
+    def redirect(self, writer):
+        self.local.writer = writer
+        try:
+            yield writer
+        finally:
+            del self.local.writer
+
+    def write(self, text):
+        return getattr(self.local, 'writer', self.default).write(text)
+
+    def flush(self):
+        getattr(self.local, 'writer', self.default).flush()
+
+
+class StatsService:
+    ''' Keeps loaded graphs in memory and runs queued jobs against them one at a time
+
+    Only the keep_jobs most recently finished jobs are kept for GET /jobs.
+    '''
+    def __init__(self, workers=1, cache=True, keep_jobs=100):
+        self.workers = workers
+        self.cache = cache
+        self.keep_jobs = keep_jobs
+        # path -> ((size, mtime) of the file when it was loaded, LoadedGraph)
+        self.graphs: Dict[str, tuple] = {}
+        self.jobs: Dict[str, Job] = {}
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        if not isinstance(sys.stdout, ThreadStdout):
+            sys.stdout = ThreadStdout(sys.stdout)
+        threading.Thread(target=self._run_jobs, daemon=True).start()
+
+    def graph(self, path):
+        ''' Return the loaded graph for path, loading it on first use and again whenever the file changes '''
+        path = os.path.abspath(path)
+        with self.lock:
+            stat = os.stat(path)
+            stamp = (stat.st_size, stat.st_mtime_ns)
+            if path not in self.graphs or self.graphs[path][0] != stamp:
+                print("Loading graph...")
+                self.graphs[path] = (stamp, load_graph(path, self.cache))
+                print("Done")
+            return self.graphs[path][1]
+
+    def submit(self, job: Job) -> Job:
+        self.jobs[job.id] = job
+        self.queue.put(job)
+        return job
+
+    def _run_jobs(self):
+        while True:
+            job = self.queue.get()
+            job.status = "running"
+            try:
+                with sys.stdout.redirect(ProgressWriter(job)):
+                    self._run(job)
+                job.status = "done"
+            except Exception:
+                job.error = traceback.format_exc()
+                job.status = "failed"
+            self._evict_jobs()
+
+    def _evict_jobs(self):
+        finished = [job.id for job in list(self.jobs.values()) if job.status in ("done", "failed")]
+        for job_id in finished[:max(len(finished) - self.keep_jobs, 0)]:
+            self.jobs.pop(job_id, None)
+
+    def _run(self, job: Job):
+        print("Loading clusters...")
+        clusters = from_existing_clustering(job.existing_clustering)
+        print("Done")
+
+        loaded = self.graph(job.input)
+        df = compute_stats(clusters, loaded, job.output, job.resolution, self.workers)
+
+        if len(job.universal_before) > 0:
+            write_universal_outputs(job.universal_before, job.output, df['cluster'].tolist(), df['n'].tolist())
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    ''' JSON API: POST /graphs, POST /jobs, GET /jobs, GET /jobs/{id} '''
+    service: StatsService = None
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        if parts == ['jobs']:
+            self._reply(200, [asdict(job) for job in list(self.service.jobs.values())])
+        elif len(parts) == 2 and parts[0] == 'jobs' and self.service.jobs.get(parts[1]) is not None:
+            self._reply(200, asdict(self.service.jobs[parts[1]]))
+        elif parts == ['graphs']:
+            self._reply(200, list(self.service.graphs))
+        else:
+            self._reply(404, {'error': f'Unknown path {self.path}'})
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or '{}')
+        except ValueError as e:
+            self._reply(400, {'error': f'Invalid JSON body: {e}'})
+            return
+        if self.path == '/jobs':
+            fields = {'input', 'existing_clustering', 'output', 'resolution', 'universal_before'}
+            try:
+                job = self.service.submit(Job(**{k: v for k, v in body.items() if k in fields}))
+            except TypeError as e:
+                self._reply(400, {'error': str(e)})
+                return
+            self._reply(202, asdict(job))
+        elif self.path == '/graphs':
+            if not isinstance(body.get('input'), str):
+                self._reply(400, {'error': "Missing network path 'input'"})
+                return
+            try:
+                self.service.graph(body['input'])
+            except Exception as e:
+                self._reply(500, {'error': f'Could not load {body["input"]}: {e}'})
+                return
+            self._reply(200, list(self.service.graphs))
+        else:
+            self._reply(404, {'error': f'Unknown path {self.path}'})
+
+    def _reply(self, code, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else 'unix'
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def main(
+    socket: str = typer.Option("", "--socket", "-s", help='Listen on this Unix socket instead of TCP'),
+    host: str = typer.Option("127.0.0.1", "--host"),
+    port: int = typer.Option(8765, "--port", "-p"),
+    preload: List[str] = typer.Option([], "--preload", "-i", help='Networks to load before accepting jobs'),
+    workers: int = typer.Option(1, "--workers"),
+    cache: bool = typer.Option(True, "--cache/--no-cache"),
+    keep_jobs: int = typer.Option(100, "--keep-jobs", help='Number of finished jobs to keep listing')
+):
+    service = StatsService(workers, cache, keep_jobs)
+    for path in preload:
+        service.graph(path)
+
+    RequestHandler.service = service
+    if socket:
+        if os.path.exists(socket):
+            os.remove(socket)
+        server = UnixHTTPServer(socket, RequestHandler)
+        print(f"Listening on {socket}")
+    else:
+        server = ThreadingHTTPServer((host, port), RequestHandler)
+        print(f"Listening on http://{host}:{port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket and os.path.exists(socket):
+            os.remove(socket)
+
+
+def entry_point():
+    typer.run(main)
+
+if __name__ == "__main__":
+    entry_point()
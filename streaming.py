@@ -0,0 +1,260 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataclasses import dataclass
+
+from hm01.graph import Graph, IntangibleSubgraph
+
+from clustering_io import Clustering
+from edge_scan import EdgeScan, scan_labels
+from graph_io import build_graph, canonical_edges, is_binary, open_edge_list
+
+# Number of files a spill is spread over; one of them is loaded at a time
+SPILL_BUCKETS = 64
+
+
+class NodeLabels:
+    ''' Node ID -> cluster position lookup for edges read from disk
+
+    Dense node IDs are looked up in an array like Clustering.labels. Sparse
+    ones are binary searched among the clustered nodes instead, so memory
+    stays proportional to the clustering rather than to the largest ID.
+    '''
+    def __init__(self, clusters):
+        nodes = clusters.nodes
+        positions = np.repeat(np.arange(len(clusters)), clusters.sizes())
+        self.dense = len(nodes) == 0 or int(nodes.max()) < 4 * len(nodes)
+        if self.dense:
+            self.labels = clusters.labels(0)
+        else:
+            order = np.argsort(nodes, kind='stable')
+            self.ids = nodes[order]
+            self.positions = positions[order]
+
+    def __call__(self, ids):
+        if self.dense:
+            inside = ids < len(self.labels)
+            labels = np.full(len(ids), -1, dtype=np.int64)
+            labels[inside] = self.labels[ids[inside]]
+            return labels
+        found = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        return np.where(self.ids[found] == ids, self.positions[found], -1)
+
+
+def iter_edge_chunks(filepath, chunk_size=1 << 22):
+    ''' Read an edge list chunk_size edges at a time, yielding (src, dst) arrays
+
+    Compressed text edge lists are decompressed on the fly and binary ones
+    are memory-mapped (see graph_io.read_raw_edges). Edges come out as they
+    are in the file: unlike graph_io.read_edge_arrays, duplicates are not
+    dropped.
+    '''
+    if is_binary(filepath):
+        if os.path.getsize(filepath) == 0:
+            return
+        edges = np.memmap(filepath, dtype='<i8', mode='r').reshape(-1, 2)
+        for start in range(0, len(edges), chunk_size):
+            chunk = np.array(edges[start:start + chunk_size])
+            yield chunk[:, 0], chunk[:, 1]
+        return
+
+    with open_edge_list(filepath) as f, pd.read_csv(
+        f, sep='\t', header=None, comment='#', usecols=[0, 1], dtype=np.int64, chunksize=chunk_size
+    ) as reader:
+        for chunk in reader:
+            edges = chunk.to_numpy()
+            yield edges[:, 0], edges[:, 1]
+
+
+class Spill:
+    ''' int64 records spilled to disk, spread over bucket files
+
+    Records are appended to the file of their bucket while streaming and
+    read back one bucket at a time, so only one bucket is ever in memory.
+    '''
+    def __init__(self, directory, name, width, buckets=SPILL_BUCKETS):
+        self.directory = directory
+        self.name = name
+        self.width = width
+        self.buckets = buckets
+        self.files = [open(self.path(b), 'wb') for b in range(buckets)]
+
+    def path(self, bucket):
+        return os.path.join(self.directory, f'{self.name}{bucket}.bin')
+
+    def write(self, buckets, *columns):
+        records = np.column_stack(columns).astype(np.int64, copy=False)
+        order = np.argsort(buckets, kind='stable')
+        starts = np.searchsorted(buckets[order], np.arange(self.buckets + 1))
+        for b in range(self.buckets):
+            if starts[b + 1] > starts[b]:
+                records[order[starts[b]:starts[b + 1]]].tofile(self.files[b])
+
+    def bytes(self):
+        return sum(os.path.getsize(self.path(b)) for b in range(self.buckets) if os.path.exists(self.path(b)))
+
+    def finish(self):
+        for f in self.files:
+            f.close()
+
+    def read(self, bucket):
+        ''' The records of a bucket, removing its file '''
+        records = np.fromfile(self.path(bucket), dtype=np.int64).reshape(-1, self.width)
+        os.remove(self.path(bucket))
+        return records
+
+
+def hash_buckets(ids, buckets):
+    ''' Bucket of each ID by a multiplicative hash, so that equal IDs share a bucket '''
+    hashed = ids.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    return ((hashed >> np.uint64(32)) % np.uint64(buckets)).astype(np.int64)
+
+
+@dataclass
+class StreamedGraph:
+    ''' What a streaming pass over the edge list leaves of the global graph
+
+    attributes
+    ----------
+    scan: per-cluster edge aggregates (see edge_scan.EdgeScan)
+    n: largest node ID plus one, the node count networkit reports for the edge
+        list, or with compact the number of distinct IDs in the edge list and the
+        clustering (see graph_io.load_graph)
+    m: number of distinct edges in the edge list
+    intra: the deduplicated intra-cluster edges, without self-loops,
+        spilled by cluster (see iter_cluster_buckets)
+    '''
+    scan: EdgeScan
+    n: int
+    m: int
+    intra: Spill
+
+
+def stream_edges(filepath, clusters, directory, chunk_size=1 << 22, compact=False) -> StreamedGraph:
+    ''' Aggregate per-cluster edge counts and spill the intra-cluster edges without loading the graph
+
+    parameters
+    ----------
+    filepath: the edge list, plain or compressed
+    clusters: Clustering (see clustering_io.load_clustering)
+    directory: where to spill edges to
+    chunk_size: edges read at a time
+    compact: count distinct node IDs instead of reporting the largest one, which
+        spills every node ID once more, bucketed by ID
+
+    The edge list is first read chunk by chunk and spilled to disk,
+    bucketed so that all copies of an edge land in the same bucket. Each
+    bucket is then loaded on its own and deduplicated like networkit
+    deduplicates the edge list (see graph_io.canonical_edges), so the
+    counts are those of the graph compute_stats loads. Only a chunk or a
+    bucket of edges, the node lookup and the per-cluster counters are in
+    memory at any time.
+    '''
+    edges = Spill(directory, 'edges', 2)
+    if compact:
+        ids = Spill(directory, 'nodes', 1)
+        ids.write(hash_buckets(clusters.nodes, ids.buckets), clusters.nodes)
+    for src, dst in iter_edge_chunks(filepath, chunk_size):
+        low = np.minimum(src, dst)
+        edges.write(hash_buckets(low, edges.buckets), low, np.maximum(src, dst))
+        if compact:
+            both = np.concatenate([src, dst])
+            ids.write(hash_buckets(both, ids.buckets), both)
+    edges.finish()
+
+    lookup = NodeLabels(clusters)
+    intra = np.zeros(len(clusters), dtype=np.int64)
+    boundary = np.zeros(len(clusters), dtype=np.int64)
+    volume = np.zeros(len(clusters), dtype=np.int64)
+    n = 0
+    m = 0
+    spill = Spill(directory, 'intra', 3)
+    for b in range(edges.buckets):
+        records = edges.read(b)
+        src, dst = canonical_edges(records[:, 0], records[:, 1])
+        del records
+        src_labels = lookup(src)
+        dst_labels = lookup(dst)
+        loops = src == dst
+        chunk = scan_labels(src_labels, dst_labels, loops, len(clusters))
+        intra += chunk.intra
+        boundary += chunk.boundary
+        volume += chunk.volume
+        m += chunk.m
+        if len(src) > 0:
+            n = max(n, int(dst.max()) + 1)
+
+        # Self-loops never cross a cut, so they are not needed for mincut or k-truss
+        spilled = (src_labels >= 0) & (src_labels == dst_labels) & ~loops
+        positions = src_labels[spilled]
+        spill.write(positions % spill.buckets, positions, src[spilled], dst[spilled])
+    spill.finish()
+
+    if compact:
+        ids.finish()
+        n = sum(len(np.unique(ids.read(b))) for b in range(ids.buckets))
+
+    return StreamedGraph(EdgeScan(intra, boundary, volume, m), n, m, spill)
+
+
+def iter_cluster_buckets(spill, clusters):
+    ''' Yield the clusters of each bucket of an intra-cluster edge spill with their edges
+
+    yields
+    ------
+    (positions, local, src, dst) where positions are the bucket's cluster
+    positions in clusters, local is a Clustering of those clusters whose
+    nodes are renumbered 0..n-1 cluster after cluster, and src, dst are
+    their edges in that numbering, sorted (see graph_io.canonical_edges)
+    '''
+    for b in range(spill.buckets):
+        mask = np.arange(len(clusters)) % spill.buckets == b
+        bucket = clusters.select(mask)
+        local = Clustering(bucket.ids, np.arange(len(bucket.nodes)), bucket.offsets)
+
+        records = spill.read(b)
+        order = np.argsort(bucket.nodes, kind='stable')
+        sorted_nodes = bucket.nodes[order]
+        src, dst = canonical_edges(
+            order[np.searchsorted(sorted_nodes, records[:, 1])],
+            order[np.searchsorted(sorted_nodes, records[:, 2])]
+        )
+        del records
+        yield np.flatnonzero(mask), local, src, dst
+
+
+def local_edges(local, src, dst, j):
+    ''' Edges of cluster j of a bucket as yielded by iter_cluster_buckets, numbered 0..n-1
+
+    returns
+    -------
+    (n, src, dst) like connectivity.realized_edges
+    '''
+    first, last = local.offsets[j], local.offsets[j + 1]
+    lo, hi = np.searchsorted(src, [first, last])
+    return last - first, src[lo:hi] - first, dst[lo:hi] - first
+
+
+def realize_local(local, src, dst, j):
+    ''' Realize cluster j of a bucket from its spilled edges alone
+
+    parameters
+    ----------
+    local, src, dst: a bucket as yielded by iter_cluster_buckets
+    j: the cluster's position in the bucket
+
+    returns
+    -------
+    (RealizedSubgraph, seconds spent realizing)
+
+    The cluster becomes a graph of its own with nodes 0..n-1, which has the
+    same mincut as the cluster realized on the global graph.
+    '''
+    start = time.perf_counter()
+    n, cluster_src, cluster_dst = local_edges(local, src, dst, j)
+    graph = Graph(build_graph(n, cluster_src, cluster_dst), "")
+    cluster = IntangibleSubgraph(list(range(n)), local.ids[j]).realize(graph)
+    return cluster, time.perf_counter() - start
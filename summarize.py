@@ -4,6 +4,8 @@ import pandas as pd
 
 from sys import argv
 
+from batch_stats import connectivity_bounds
+
 base, ext = os.path.splitext(argv[1])
 
 def summarize_stats(filename):
@@ -127,7 +129,7 @@ def summarize_stats(filename):
             'node_coverage_gr10': coverage_11
         })
 
-    return summary_stats
+    return pd.concat([summary_stats, connectivity_bounds(stats)])
 
 summary_stats = summarize_stats(argv[1])
 summary_stats.to_csv(base + '_summary.csv', header=False)
@@ -0,0 +1,34 @@
+import sys
+
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from clustering_io import load_clustering
+
+
+def split_clusters(filepath):
+    ''' The clusters the line-by-line loaders built, as (cluster ID, nodes) in order of first appearance '''
+    clusters = {}
+    with open(filepath) as f:
+        for line in f:
+            node_id, cluster_id = line.split()
+            clusters.setdefault(cluster_id, []).append(int(node_id))
+    return list(clusters.items())
+
+
+def test_cluster_ids_round_trip(tmp_path):
+    filepath = tmp_path / 'clustering.tsv'
+    filepath.write_text('1\t"a"\n2\t"a"\n3 NA\n4\tnan\n5  x,y\n6\t"a\n7\t\'b\'\n8\tNA\n')
+
+    clusters = load_clustering(filepath)
+    assert [(clusters.ids[i], clusters.members(i).tolist()) for i in range(len(clusters))] == split_clusters(filepath)
+
+
+def test_empty_clustering(tmp_path):
+    filepath = tmp_path / 'clustering.tsv'
+    filepath.write_text('')
+
+    clusters = load_clustering(filepath)
+    assert len(clusters) == 0
+    assert len(clusters.without_singletons()) == 0
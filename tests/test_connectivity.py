@@ -0,0 +1,74 @@
+import sys
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+pytest.importorskip('hm01')
+
+from clustering_io import Clustering
+from connectivity import TIERS, VIECUT, certify_mincuts, mincut_bounds
+from graph_io import canonical_edges
+
+
+def planted_graph(n, sizes, p_in, p_out, rng):
+    ''' Random graph with clusters of the given sizes on a random permutation of the nodes, plus self-loops '''
+    nodes = rng.permutation(n)[:sum(sizes)]
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    clusters = Clustering(np.arange(len(sizes)).astype(str).astype(object), nodes, offsets)
+    labels = clusters.labels(n)
+
+    u, v = np.triu_indices(n, 1)
+    p = np.where((labels[u] >= 0) & (labels[u] == labels[v]), p_in[np.maximum(labels[u], 0)], p_out)
+    keep = rng.random(len(u)) < p
+    loops = rng.integers(0, n, 5)
+    return clusters, canonical_edges(np.r_[u[keep], loops], np.r_[v[keep], loops])
+
+
+def stoer_wagner(graph):
+    if graph.number_of_nodes() < 2 or not nx.is_connected(graph):
+        return 0
+    return nx.stoer_wagner(graph)[0]
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_certify_mincuts(seed):
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(2, 25, 12)
+    # From sparse clusters that fall apart to cliques
+    p_in = rng.choice([0.05, 0.3, 0.6, 0.9, 1.0], len(sizes))
+    n = int(sizes.sum()) + 10
+    clusters, (src, dst) = planted_graph(n, sizes, p_in, 0.02, rng)
+    graph = nx.Graph(zip(src.tolist(), dst.tolist()))
+    graph.remove_edges_from(nx.selfloop_edges(graph))
+
+    mincuts, tiers = certify_mincuts(clusters, clusters.labels(n), src, dst)
+    assert (tiers < VIECUT).any()
+    for i in range(len(clusters)):
+        subgraph = nx.Graph()
+        subgraph.add_nodes_from(clusters.members(i).tolist())
+        subgraph.add_edges_from(graph.subgraph(clusters.members(i).tolist()).edges())
+        if tiers[i] == VIECUT:
+            assert mincuts[i] == -1
+        else:
+            assert mincuts[i] == stoer_wagner(subgraph), TIERS[tiers[i]]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_mincut_bounds(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(4, 40))
+    u, v = np.triu_indices(n, 1)
+    keep = rng.random(len(u)) < rng.uniform(0.1, 0.9)
+    # A random path keeps the graph connected, like the clusters no certificate settles
+    path_nodes = rng.permutation(n)
+    src, dst = canonical_edges(np.r_[u[keep], path_nodes[:-1]], np.r_[v[keep], path_nodes[1:]])
+    graph = nx.Graph(zip(src.tolist(), dst.tolist()))
+
+    lower, upper = mincut_bounds(n, src, dst, rng=np.random.default_rng(seed))
+    assert lower <= stoer_wagner(graph) <= upper
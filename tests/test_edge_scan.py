@@ -0,0 +1,52 @@
+import sys
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from clustering_io import Clustering, label_matrix
+from edge_scan import scan_clusterings, scan_edges
+from graph_io import canonical_edges
+
+
+def random_clustering(n, count, rng, coverage=1.0):
+    ''' count clusters over a random coverage fraction of the nodes '''
+    nodes = rng.permutation(n)[:int(n * coverage)]
+    cuts = np.sort(rng.choice(np.arange(1, len(nodes)), count - 1, replace=False))
+    offsets = np.r_[0, cuts, len(nodes)]
+    return Clustering(np.arange(count).astype(str).astype(object), nodes, offsets)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_scan_clusterings(seed):
+    rng = np.random.default_rng(seed)
+    n = 80
+    u, v = np.triu_indices(n, 1)
+    keep = rng.random(len(u)) < 0.1
+    src, dst = canonical_edges(u[keep], v[keep])
+    graph = nx.Graph()
+    graph.add_nodes_from(range(n))
+    graph.add_edges_from(zip(src.tolist(), dst.tolist()))
+
+    clusterings = [random_clustering(n, 5, rng), random_clustering(n, 12, rng), random_clustering(n, 7, rng, coverage=0.6)]
+    scans = scan_clusterings(label_matrix(clusterings, n), [len(c) for c in clusterings], src, dst, chunk_size=97)
+
+    for clustering, scan in zip(clusterings, scans):
+        single = scan_edges(clustering.labels(n), src, dst, len(clustering))
+        assert np.array_equal(scan.intra, single.intra)
+        assert np.array_equal(scan.boundary, single.boundary)
+        assert np.array_equal(scan.volume, single.volume)
+
+        communities = [set(clustering.members(i).tolist()) for i in range(len(clustering))]
+        for i, community in enumerate(communities):
+            assert scan.intra[i] == graph.subgraph(community).number_of_edges()
+            assert scan.boundary[i] == nx.cut_size(graph, community)
+            assert scan.volume[i] == nx.volume(graph, community)
+            if 0 < scan.volume[i] < 2 * scan.m:
+                assert np.isclose(scan.conductance()[i], nx.conductance(graph, community))
+        if len(clustering.nodes) == n:
+            assert np.isclose(scan.modularity().sum(), nx.community.modularity(graph, communities))
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from graph_io import canonical_edges
+from kcore import iterative_kcore
+
+# ikc.py to compare against, e.g. IKC_PATH=../ikc.py python3 -m pytest tests
+IKC_PATH = os.environ.get('IKC_PATH', '')
+
+
+def planted_graph(n, parts, p_in, p_out, rng, loops=0):
+    ''' Random graph with parts planted groups of nodes, plus a few self-loops '''
+    group = rng.integers(0, parts, n)
+    u, v = np.triu_indices(n, 1)
+    p = np.where(group[u] == group[v], p_in, p_out)
+    keep = rng.random(len(u)) < p
+    loop_nodes = rng.integers(0, n, loops)
+    return canonical_edges(np.r_[u[keep], loop_nodes], np.r_[v[keep], loop_nodes])
+
+
+def run_ikc(directory, src, dst, k):
+    ''' Clusters ikc.py reports, as (nodes, core, modularity) in its cluster number order '''
+    edge_list = path.join(directory, 'graph.tsv')
+    output = path.join(directory, 'ikc.csv')
+    with open(edge_list, 'w') as f:
+        f.writelines(f'{u}\t{v}\n' for u, v in zip(src.tolist(), dst.tolist()))
+    subprocess.run([sys.executable, IKC_PATH, '-e', edge_list, '-o', output, '-k', str(k)], check=True, capture_output=True)
+
+    clusters = {}
+    with open(output) as f:
+        for line in f:
+            node_id, cluster_number, core, modularity = line.strip().split(',')
+            nodes, _, _ = clusters.setdefault(int(cluster_number), ([], int(core), float(modularity)))
+            nodes.append(int(node_id))
+    return [(sorted(nodes), core, modularity) for _, (nodes, core, modularity) in sorted(clusters.items())]
+
+
+@pytest.mark.skipif(not IKC_PATH, reason='needs IKC_PATH pointing to ikc.py')
+@pytest.mark.parametrize('seed', range(8))
+@pytest.mark.parametrize('k', [0, 2, 5])
+def test_matches_ikc(tmp_path, seed, k):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(20, 200))
+    src, dst = planted_graph(n, int(rng.integers(1, 5)), 0.3, 0.02, rng, loops=3)
+
+    clusters, cores, modularities = iterative_kcore(n, src, dst, k)
+    expected = run_ikc(str(tmp_path), src, dst, k)
+
+    assert [clusters.ids[i] for i in range(len(clusters))] == list(range(1, len(expected) + 1))
+    assert [sorted(clusters.members(i).tolist()) for i in range(len(clusters))] == [nodes for nodes, _, _ in expected]
+    assert cores.tolist() == [core for _, core, _ in expected]
+    assert np.allclose(modularities, [modularity for _, _, modularity in expected])
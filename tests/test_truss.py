@@ -0,0 +1,61 @@
+import sys
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+from clustering_io import Clustering
+from graph_io import canonical_edges
+from truss import cluster_ktrusses, truss_decomposition
+
+
+def random_graph(n, p, rng):
+    u, v = np.triu_indices(n, 1)
+    keep = rng.random(len(u)) < p
+    return canonical_edges(u[keep], v[keep])
+
+
+def as_networkx(n, u, v):
+    graph = nx.Graph()
+    graph.add_nodes_from(range(n))
+    graph.add_edges_from(zip(u.tolist(), v.tolist()))
+    return graph
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_truss_decomposition(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(5, 40))
+    u, v = random_graph(n, rng.uniform(0.1, 0.8), rng)
+    graph = as_networkx(n, u, v)
+
+    trussness = truss_decomposition(n, u, v)
+    for k in range(2, int(trussness.max(initial=2)) + 2):
+        expected = {tuple(sorted(edge)) for edge in nx.k_truss(graph, k).edges()}
+        assert set(zip(u[trussness >= k].tolist(), v[trussness >= k].tolist())) == expected
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_cluster_ktrusses(seed):
+    rng = np.random.default_rng(seed)
+    n = 60
+    u, v = random_graph(n, 0.3, rng)
+    graph = as_networkx(n, u, v)
+    nodes = rng.permutation(n)[:50]
+    offsets = np.array([0, 5, 20, 21, 50])
+    clusters = Clustering(np.array(['a', 'b', 'c', 'd'], dtype=object), nodes, offsets)
+
+    ktrusses = cluster_ktrusses(clusters, clusters.labels(n), u, v)
+    for i in range(len(clusters)):
+        subgraph = graph.subgraph(clusters.members(i).tolist())
+        k = int(ktrusses.max_k[i])
+        if subgraph.number_of_edges() == 0:
+            assert k == 0 and len(ktrusses.members(i)) == 0
+            continue
+        assert nx.k_truss(subgraph, k).number_of_edges() > 0
+        assert nx.k_truss(subgraph, k + 1).number_of_edges() == 0
+        assert ktrusses.members(i).tolist() == sorted(nx.k_truss(subgraph, k).nodes())
@@ -0,0 +1,59 @@
+import sys
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+pytest.importorskip('hm01')
+
+from checkpoint import read_rows
+from graph_io import load_graph
+from stats import compute_stats, from_existing_clustering, update_stats
+
+
+def write_edges(filepath, u, v):
+    with open(filepath, 'w') as f:
+        f.writelines(f'{a}\t{b}\n' for a, b in zip(u.tolist(), v.tolist()))
+
+
+def planted_network(tmp_path, seed):
+    ''' An old network, a delta with duplicates, known edges, self-loops and a new node, the updated network and a clustering '''
+    rng = np.random.default_rng(seed)
+    n = 120
+    group = rng.integers(0, 8, n)
+    u, v = np.triu_indices(n, 1)
+    p = np.where(group[u] == group[v], rng.uniform(0.2, 0.9, 8)[group[u]], 0.01)
+    edges = rng.random(len(u)) < p
+    u, v = u[edges], v[edges]
+    added = rng.random(len(u)) < 0.1
+
+    delta_u = np.r_[u[added], u[added][:3], u[~added][:3], [5, 7], [n]]
+    delta_v = np.r_[v[added], v[added][:3], v[~added][:3], [5, 7], [0]]
+    write_edges(tmp_path / 'old.tsv', u[~added], v[~added])
+    write_edges(tmp_path / 'delta.tsv', delta_u, delta_v)
+    write_edges(tmp_path / 'new.tsv', np.r_[u[~added], delta_u], np.r_[v[~added], delta_v])
+    with open(tmp_path / 'clustering.tsv', 'w') as f:
+        f.writelines(f'{node}\t{group[node]}\n' for node in range(n))
+    return nx.Graph(zip(np.r_[u, delta_u].tolist(), np.r_[v, delta_v].tolist())), group
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_update_matches_recompute(tmp_path, seed):
+    graph, group = planted_network(tmp_path, seed)
+    clusters = from_existing_clustering(str(tmp_path / 'clustering.tsv'))
+
+    previous = str(tmp_path / 'previous.csv')
+    compute_stats(clusters, load_graph(str(tmp_path / 'old.tsv'), False), previous, 0.1)
+    updated = str(tmp_path / 'updated.csv')
+    update_stats(clusters, load_graph(str(tmp_path / 'old.tsv'), False), read_rows(previous), str(tmp_path / 'delta.tsv'), updated, 0.1)
+    full = str(tmp_path / 'full.csv')
+    df = compute_stats(clusters, load_graph(str(tmp_path / 'new.tsv'), False), full, 0.1)
+
+    with open(updated) as f_updated, open(full) as f_full:
+        assert f_updated.read() == f_full.read()
+    for cluster, m in zip(df['cluster'].iloc[:-1], df['m'].iloc[:-1]):
+        assert m == graph.subgraph(np.flatnonzero(group == int(cluster)).tolist()).number_of_edges()
@@ -0,0 +1,169 @@
+import numpy as np
+
+from dataclasses import dataclass
+
+# Upper bound on wedges materialized at once while listing triangles
+WEDGE_CHUNK = 1 << 24
+
+
+@dataclass
+class KTrusses:
+    ''' The max k-truss of every cluster
+
+    attributes
+    ----------
+    max_k: largest k such that the cluster has a non-empty k-truss (0 for clusters without edges)
+    nodes: nodes of the max k-trusses, cluster after cluster, ascending within a cluster
+    offsets: cluster i's max k-truss has nodes[offsets[i]:offsets[i + 1]]
+    '''
+    max_k: np.ndarray
+    nodes: np.ndarray
+    offsets: np.ndarray
+
+    def members(self, i):
+        return self.nodes[self.offsets[i]:self.offsets[i + 1]]
+
+
+def list_triangles(n, u, v):
+    ''' List the triangles of a simple graph as triples of edge indices
+
+    parameters
+    ----------
+    n: number of nodes
+    u, v: edge endpoints, without self-loops or duplicate edges
+
+    Every edge is oriented from its lower to its higher (degree, id) ranked
+    endpoint, which bounds the out-degree of every node by sqrt(2m). Each
+    triangle is then found exactly once, from the pair of out-edges of its
+    lowest ranked node.
+    '''
+    m = len(u)
+    degree = np.bincount(u, minlength=n) + np.bincount(v, minlength=n)
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.lexsort((np.arange(n), degree))] = np.arange(n)
+
+    flip = rank[u] > rank[v]
+    tail = np.where(flip, v, u)
+    head = np.where(flip, u, v)
+    order = np.argsort(tail, kind='stable')
+    tail, head = tail[order], head[order]
+
+    # Edge lookup by (low, high) key, for closing wedges
+    low = np.minimum(u, v)
+    keys = low * n + (u + v - low)
+    key_order = np.argsort(keys)
+    sorted_keys = keys[key_order]
+
+    # Out-edge p pairs with every later out-edge of the same tail
+    group_end = np.cumsum(np.bincount(tail, minlength=n))[tail]
+    partners = group_end - np.arange(m) - 1
+    wedge_ends = np.cumsum(partners)
+
+    triangles = []
+    first = 0
+    while first < m:
+        budget = (wedge_ends[first - 1] if first > 0 else 0) + WEDGE_CHUNK
+        last = max(int(np.searchsorted(wedge_ends, budget, side='right')), first + 1)
+        counts = partners[first:last]
+        p = np.repeat(np.arange(first, last), counts)
+        q = p + 1 + np.arange(len(p)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        x, y = head[p], head[q]
+        low = np.minimum(x, y)
+        wedge_keys = low * n + (x + y - low)
+        found = np.searchsorted(sorted_keys, wedge_keys)
+        found[found == m] = 0
+        closed = sorted_keys[found] == wedge_keys
+        triangles.append(np.stack([order[p[closed]], order[q[closed]], key_order[found[closed]]], axis=1))
+        first = last
+
+    if not triangles:
+        return np.empty((0, 3), dtype=np.int64)
+    return np.concatenate(triangles)
+
+
+def truss_decomposition(n, u, v):
+    ''' Trussness of every edge: the largest k such that the edge is in the k-truss
+
+    parameters
+    ----------
+    n: number of nodes
+    u, v: edge endpoints, without self-loops or duplicate edges
+
+    Peels in batches: at level k, every edge supported by fewer than k-2
+    triangles is removed at once, and only the edges sharing a triangle
+    with a removed edge have their support updated and are rechecked.
+    '''
+    m = len(u)
+    triangles = list_triangles(n, u, v)
+    support = np.bincount(triangles.ravel(), minlength=m)
+    trussness = np.full(m, 2, dtype=np.int64)
+
+    # Edge -> triangle incidence, as a CSR over the flattened triangle array
+    incidence = np.argsort(triangles.ravel(), kind='stable') // 3
+    incidence_ptr = np.zeros(m + 1, dtype=np.int64)
+    np.cumsum(support, out=incidence_ptr[1:])
+
+    alive = np.ones(m, dtype=bool)
+    alive_triangles = np.ones(len(triangles), dtype=bool)
+    remaining = m
+    k = 2
+    while remaining > 0:
+        k = max(k + 1, int(support[alive].min()) + 3)
+        peel = np.flatnonzero(alive & (support < k - 2))
+        while len(peel) > 0:
+            trussness[peel] = k - 1
+            alive[peel] = False
+            remaining -= len(peel)
+
+            starts = incidence_ptr[peel]
+            lengths = incidence_ptr[peel + 1] - starts
+            positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            dying = np.unique(incidence[positions])
+            dying = dying[alive_triangles[dying]]
+            alive_triangles[dying] = False
+
+            touched, counts = np.unique(triangles[dying].ravel(), return_counts=True)
+            support[touched] -= counts
+            touched = touched[alive[touched]]
+            peel = touched[support[touched] < k - 2]
+
+    return trussness
+
+
+def cluster_ktrusses(clusters, labels, src, dst) -> KTrusses:
+    ''' Max k-truss of every cluster, from one truss decomposition of all intra-cluster edges
+
+    parameters
+    ----------
+    clusters: Clustering (see clustering_io.load_clustering)
+    labels: node -> cluster position array (see Clustering.labels)
+    src, dst: edge endpoint arrays (see graph_io.read_edge_arrays)
+
+    Triangles never span two clusters once inter-cluster edges are
+    dropped, so decomposing the union of the clusters' induced subgraphs
+    decomposes each of them.
+    '''
+    n = len(labels)
+    src_labels = labels[src]
+    intra = (src_labels >= 0) & (src_labels == labels[dst]) & (src != dst)
+    u, v = src[intra], dst[intra]
+    edge_labels = src_labels[intra]
+
+    trussness = truss_decomposition(n, u, v)
+
+    max_k = np.zeros(len(clusters), dtype=np.int64)
+    if len(u) > 0:
+        order = np.argsort(edge_labels, kind='stable')
+        sorted_labels = edge_labels[order]
+        starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+        max_k[sorted_labels[starts]] = np.maximum.reduceat(trussness[order], starts)
+
+    top = trussness == max_k[edge_labels]
+    members = np.unique(np.concatenate([
+        edge_labels[top] * n + u[top],
+        edge_labels[top] * n + v[top],
+    ]))
+    offsets = np.zeros(len(clusters) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(members // n, minlength=len(clusters)), out=offsets[1:])
+    return KTrusses(max_k, members % n, offsets)